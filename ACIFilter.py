@@ -0,0 +1,394 @@
+#
+#  ACIFilter.py
+#
+"""
+   Parser and local evaluator for APIC query-target-filter expressions
+
+   The APIC accepts a logical filter on class and MO queries, for example:
+
+       eq(aaaUser.descr,"aci_trainer")
+       and(eq(fvCEp.encap,"vlan-100"),wcard(fvCEp.dn,"tn-xStart"))
+
+   This module parses the same grammar and applies it to a list of MO
+   attribute dictionaries (e.g. a cached class query), so a filtered query can
+   be answered without a round trip to the controller.
+
+   Supported operators: eq, ne, lt, gt, le, ge, bw, wcard, anybit, allbits,
+   and, or, not
+
+# Version     Date           Comments
+# ----------- ------------   -------------------------------------------------
+# 1.0        19 Oct   2026   initial release
+"""
+import re
+
+
+class FilterError(ValueError):
+    """ raised when a filter expression can not be parsed """
+    pass
+
+
+# ---------------------------------------------------------------------------
+# VALUE HELPERS
+# ---------------------------------------------------------------------------
+
+def to_number(value):
+    " return the value as an int or float, or None if it is not numeric "
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def compare(left, right):
+    """ compare two attribute values, numerically when both are numbers, otherwise
+        as strings. Returns -1, 0 or 1 like cmp()
+    """
+    l_num = to_number(left)
+    r_num = to_number(right)
+    if l_num is not None and r_num is not None:
+        left, right = l_num, r_num
+    else:
+        left, right = str(left), str(right)
+    return (left > right) - (left < right)
+
+
+def bits(value):
+    " the set of flags in a comma separated bitmask attribute, e.g. 'learned,vmm' "
+    return set([flag.strip() for flag in str(value).split(",") if flag.strip()])
+
+
+# ---------------------------------------------------------------------------
+# INDEX
+# ---------------------------------------------------------------------------
+
+class MOIndex(object):
+    """
+      A list of MO attribute dictionaries with lazily built per-attribute indexes.
+      Positions in the list are used as row identifiers by the filter nodes.
+    """
+    def __init__(self, mos):
+        self.mos = list(mos)
+        self.indexes = {}                                   # attribute name -> {value: set of positions}
+
+    def all(self):
+        " set of all row positions "
+        return set(range(len(self.mos)))
+
+    def lookup(self, attr, value):
+        " set of positions where attr == value, building the index on first use "
+        try:
+            index = self.indexes[attr]
+        except KeyError:
+            index = {}
+            for position, mo in enumerate(self.mos):
+                index.setdefault(mo.get(attr), set()).add(position)
+            self.indexes[attr] = index
+        return index.get(value, set())
+
+    def rows(self, positions):
+        " return the MOs at the given positions, in their original order "
+        return [self.mos[position] for position in sorted(positions)]
+
+
+# ---------------------------------------------------------------------------
+# FILTER NODES
+# ---------------------------------------------------------------------------
+
+class Node(object):
+    """ base class of a parsed filter, subclasses implement match() and may
+        override select() when an index can answer faster than a scan
+    """
+    indexed = False
+
+    def match(self, mo):
+        raise NotImplementedError
+
+    def classes(self):
+        " the set of class names referenced by properties in the filter "
+        return set()
+
+    def select(self, index, candidates=None):
+        " return the set of positions in index that satisfy the filter "
+        if candidates is None:
+            candidates = index.all()
+        return set([position for position in candidates if self.match(index.mos[position])])
+
+
+class Compare(Node):
+    """ property operator, eq(fvCEp.ip,"192.0.2.5") """
+    tests = {"eq": lambda c: c == 0,
+             "ne": lambda c: c != 0,
+             "lt": lambda c: c < 0,
+             "gt": lambda c: c > 0,
+             "le": lambda c: c <= 0,
+             "ge": lambda c: c >= 0}
+
+    def __init__(self, op, prop, value):
+        self.op = op
+        self.aci_class, self.attr = prop
+        self.value = value
+        self.indexed = (op == "eq")
+
+    def classes(self):
+        return set([self.aci_class])
+
+    def match(self, mo):
+        try:
+            actual = mo[self.attr]
+        except KeyError:
+            return False
+        if self.op in ("eq", "ne"):
+            return self.tests[self.op]((actual > self.value) - (actual < self.value))
+        return self.tests[self.op](compare(actual, self.value))
+
+    def select(self, index, candidates=None):
+        if self.op != "eq":
+            return Node.select(self, index, candidates)
+        found = index.lookup(self.attr, self.value)
+        if candidates is not None:
+            found = found & candidates
+        return set(found)
+
+
+class Between(Node):
+    """ bw(fvCEp.encap,"vlan-100","vlan-199"), inclusive of both bounds """
+    def __init__(self, prop, low, high):
+        self.aci_class, self.attr = prop
+        self.low = low
+        self.high = high
+
+    def classes(self):
+        return set([self.aci_class])
+
+    def match(self, mo):
+        try:
+            actual = mo[self.attr]
+        except KeyError:
+            return False
+        return compare(actual, self.low) >= 0 and compare(actual, self.high) <= 0
+
+
+class Wildcard(Node):
+    """ wcard(fvCEp.dn,"tn-xStart"), the value is a regular expression searched in the attribute """
+    def __init__(self, prop, pattern):
+        self.aci_class, self.attr = prop
+        try:
+            self.pattern = re.compile(pattern)
+        except re.error as e:
+            raise FilterError("wcard: invalid pattern %s: %s" % (pattern, e))
+
+    def classes(self):
+        return set([self.aci_class])
+
+    def match(self, mo):
+        try:
+            return self.pattern.search(mo[self.attr]) is not None
+        except KeyError:
+            return False
+
+
+class Bitmask(Node):
+    """ anybit(fvCEp.lcC,"learned,vmm") and allbits(...) on comma separated flag attributes """
+    def __init__(self, op, prop, value):
+        self.op = op
+        self.aci_class, self.attr = prop
+        self.bits = bits(value)
+
+    def classes(self):
+        return set([self.aci_class])
+
+    def match(self, mo):
+        try:
+            actual = bits(mo[self.attr])
+        except KeyError:
+            return False
+        if self.op == "anybit":
+            return bool(actual & self.bits)
+        return self.bits <= actual
+
+
+class And(Node):
+    " and(expr, expr, ...) "
+    def __init__(self, children):
+        self.children = children
+        self.indexed = any(child.indexed for child in children)
+
+    def classes(self):
+        return set().union(*[child.classes() for child in self.children])
+
+    def match(self, mo):
+        return all(child.match(mo) for child in self.children)
+
+    def select(self, index, candidates=None):
+        # let the indexed terms narrow the candidates before any term scans
+        ordered = [c for c in self.children if c.indexed] + [c for c in self.children if not c.indexed]
+        for child in ordered:
+            candidates = child.select(index, candidates)
+            if not candidates:
+                break
+        return candidates
+
+
+class Or(Node):
+    " or(expr, expr, ...) "
+    def __init__(self, children):
+        self.children = children
+        self.indexed = all(child.indexed for child in children)
+
+    def classes(self):
+        return set().union(*[child.classes() for child in self.children])
+
+    def match(self, mo):
+        return any(child.match(mo) for child in self.children)
+
+    def select(self, index, candidates=None):
+        found = set()
+        for child in self.children:
+            found |= child.select(index, candidates)
+        return found
+
+
+class Not(Node):
+    " not(expr) "
+    def __init__(self, child):
+        self.child = child
+
+    def classes(self):
+        return self.child.classes()
+
+    def match(self, mo):
+        return not self.child.match(mo)
+
+    def select(self, index, candidates=None):
+        if candidates is None:
+            candidates = index.all()
+        return candidates - self.child.select(index, candidates)
+
+
+# ---------------------------------------------------------------------------
+# PARSER
+# ---------------------------------------------------------------------------
+
+TOKEN = re.compile(r'\s*(?:(?P<string>"(?:[^"\\]|\\.)*")|(?P<shell>\\"(?:.*?)\\")(?=\s*[,)]|\s*$)|'
+                   r'(?P<punct>[(),])|(?P<word>[^\s(),"]+))')
+
+
+def tokenize(text):
+    " split a filter expression into (kind, value) tokens "
+    tokens = []
+    position = 0
+    text = text.strip()
+    while position < len(text):
+        m = TOKEN.match(text, position)
+        if m is None or m.end() == position:
+            raise FilterError("unexpected character at %s in %s" % (position, text))
+        position = m.end()
+        if m.group("string") is not None:
+            value = m.group("string")[1:-1]
+            tokens.append(("value", re.sub(r'\\(.)', r'\1', value)))
+        elif m.group("shell") is not None:
+            value = m.group("shell")[2:-2]                     # \"vlan-100\" as written in a playbook
+            tokens.append(("value", re.sub(r'\\(.)', r'\1', value)))
+        elif m.group("punct") is not None:
+            tokens.append((m.group("punct"), m.group("punct")))
+        elif m.group("word") is not None:
+            tokens.append(("word", m.group("word")))
+    return tokens
+
+
+class Parser(object):
+    """ recursive descent parser, operator(argument, argument, ...) where an
+        argument is a nested expression, a class.attribute property or a value
+    """
+    arity = {"eq": 2, "ne": 2, "lt": 2, "gt": 2, "le": 2, "ge": 2,
+             "wcard": 2, "anybit": 2, "allbits": 2, "bw": 3, "not": 1}
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = tokenize(text)
+        self.position = 0
+
+    def peek(self):
+        try:
+            return self.tokens[self.position]
+        except IndexError:
+            return (None, None)
+
+    def take(self, kind=None):
+        token = self.peek()
+        if token[0] is None or (kind is not None and token[0] != kind):
+            raise FilterError("expected %s in %s" % (kind or "token", self.text))
+        self.position += 1
+        return token
+
+    def parse(self):
+        node = self.expression()
+        if self.peek()[0] is not None:
+            raise FilterError("trailing characters in %s" % self.text)
+        return node
+
+    def expression(self):
+        op = self.take("word")[1]
+        self.take("(")
+        args = [self.argument()]
+        while self.peek()[0] == ",":
+            self.take(",")
+            args.append(self.argument())
+        self.take(")")
+        return self.build(op, args)
+
+    def argument(self):
+        kind, value = self.peek()
+        if kind == "word" and self.position + 1 < len(self.tokens) and self.tokens[self.position + 1][0] == "(":
+            return self.expression()
+        self.take()
+        if kind not in ("word", "value"):
+            raise FilterError("unexpected %s in %s" % (value, self.text))
+        return value
+
+    def build(self, op, args):
+        if op in ("and", "or"):
+            if not args or not all(isinstance(arg, Node) for arg in args):
+                raise FilterError("%s expects expressions in %s" % (op, self.text))
+            return And(args) if op == "and" else Or(args)
+
+        try:
+            arity = self.arity[op]
+        except KeyError:
+            raise FilterError("unsupported operator %s in %s" % (op, self.text))
+        if len(args) != arity:
+            raise FilterError("%s expects %s arguments in %s" % (op, arity, self.text))
+
+        if op == "not":
+            if not isinstance(args[0], Node):
+                raise FilterError("not expects an expression in %s" % self.text)
+            return Not(args[0])
+
+        if any(isinstance(arg, Node) for arg in args):
+            raise FilterError("%s expects a property and values in %s" % (op, self.text))
+        prop = args[0].split(".", 1)
+        if len(prop) != 2:
+            raise FilterError("%s is not a class.attribute property" % args[0])
+        if op == "bw":
+            return Between(prop, args[1], args[2])
+        if op == "wcard":
+            return Wildcard(prop, args[1])
+        if op in ("anybit", "allbits"):
+            return Bitmask(op, prop, args[1])
+        return Compare(op, prop, args[1])
+
+
+def parse(text):
+    " parse a query-target-filter expression and return the root node "
+    return Parser(text).parse()
+
+
+def apply_filter(text, mos):
+    " return the MOs (attribute dictionaries) which satisfy the filter expression "
+    index = MOIndex(mos)
+    return index.rows(parse(text).select(index))
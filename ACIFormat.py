@@ -0,0 +1,61 @@
+#
+#  ACIFormat.py
+#
+"""
+   Formatting of APIC query responses into Ansible facts, shared by aci_gather_facts
+   and the standalone aci_collect_facts, so the latter runs without Ansible installed
+
+   A class query returns {"imdata": [{"fvTenant": {"attributes": {...}}}, ...]}, the
+   facts are a list of attribute dictionaries per class:
+
+       {"ansible_facts": {"fvTenant": [{"name": "common", "dn": "uni/tn-common", ...}, ...]}}
+
+# Version     Date           Comments
+# ----------- ------------   -------------------------------------------------
+# 1.0        19 Oct   2026   initial release, moved from aci_gather_facts
+"""
+import re
+
+
+CLASS_URI = re.compile(r'^/api/(?:node/)?class/(\w+)\.json$')
+
+def uri_class(uri):
+    " return the class name of a class query URI, None for MO and other queries "
+    m = CLASS_URI.match(uri)
+    if m:
+        return m.group(1)
+    return None
+
+
+def format_imdata(content):
+    """ formats a list of imdata elements into an Ansible fact, see aci_gather_facts.format_content """
+    element = {}                                           # dictionary to hold the class
+    result = { 'ansible_facts': {} }                       # the result is a dictionary with one element called 'ansible_facts'
+    for item in content:                                   # content is a *list* of one or more elements returned for the class query
+        flatten(item, element, None)
+
+    result["ansible_facts"] = element
+    return result
+
+
+def flatten(item, element, parent_dn):
+    """ append the MO in item to the list of its class in element, then recurse into
+        the children returned by a subtree query (rsp-subtree). Children are identified
+        by their rn, so the dn is built from the parent and saved with the parent_dn.
+    """
+    d_item = dict(item)
+    aci_class = d_item.keys()[0]                           # get the name of the class we queried
+    try:
+        element[aci_class]
+    except KeyError:
+        element[aci_class] = []                            # each returned MO is a list element
+
+    attributes = d_item[aci_class]["attributes"]
+    if parent_dn is not None:
+        if not attributes.get("dn") and attributes.get("rn"):
+            attributes["dn"] = "%s/%s" % (parent_dn, attributes["rn"])
+        attributes["parent_dn"] = parent_dn
+    element[aci_class].append(attributes)                  # append the MO to our class dictionary
+
+    for child in d_item[aci_class].get("children", []):
+        flatten(child, element, attributes.get("dn"))
@@ -16,11 +16,79 @@
 # 2.3         3 Aug   2016   Disable InsecureRequestWarning
 # 2.5        22 Aug   2016   Conditionally Disable InsecureRequestWarning due to backlevel python on APIC
 # 2.6         15 May  2018   Mayank added new EPG
+# 2.7         19 Oct  2026   record requests and responses to a trace file for aci_replay
+# 2.8         19 Oct  2026   streamed (optionally gzip) POST bodies, size capped streaming response reader
+# 2.9         19 Oct  2026   clone() to share a login session between threads
+# 3.0         19 Oct  2026   write_atomic for the local caches of the modules
+# 3.1         19 Oct  2026   the trace records the full size of a truncated response
+# 3.2         19 Oct  2026   trace lines are appended under flock, parallel forks do not interleave
 """
 import requests
 import xml
 import xml.dom.minidom
 import time
+import os
+import re
+import json
+import mmap
+import zlib
+import fcntl
+import tempfile
+import threading
+#
+record_lock = threading.Lock()                            # serializes writes to trace files, flock between processes
+CHUNK_SIZE = 65536                                        # bytes read or sent at a time when streaming
+#
+# values replaced before a request or response is recorded: passwords, session tokens
+SANITIZE = re.compile(r'((?:pwd|token|sessionId|urlToken)(?:"\s*:\s*|=)")[^"]*(")')
+#
+#
+#
+def chunks(data):
+    """ iterate over a request body in CHUNK_SIZE pieces, the body may be a string,
+        a memory-mapped file, a file object or any iterable of strings
+    """
+    if isinstance(data, (basestring, mmap.mmap)):
+        for offset in xrange(0, len(data), CHUNK_SIZE):
+            yield data[offset:offset + CHUNK_SIZE]
+    elif hasattr(data, "read"):
+        while True:
+            chunk = data.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    else:
+        for chunk in data:
+            yield chunk
+#
+#
+#
+def gzip_chunks(iterable):
+    " gzip compress an iterable of strings on the fly "
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in iterable:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+#
+#
+#
+def write_atomic(filename, content):
+    """ write the file under a temporary name in the same directory and rename it, so a
+        concurrent reader never sees a partial copy. Creates the directory if needed
+    """
+    directory = os.path.dirname(filename) or "."
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    fd, tmpname = tempfile.mkstemp(dir=directory)
+    try:
+        with os.fdopen(fd, "w") as tmpfo:
+            tmpfo.write(content)
+        os.rename(tmpname, filename)
+    except (IOError, OSError):
+        os.remove(tmpname)
+        raise
 #
 class Connection(object):
     """
@@ -50,6 +118,12 @@ class Connection(object):
                                                       # generic templates for all other REST Calls
         self.generic_XML = None
         self.generic_URL = "%s://%s/api/mo/uni.xml"   # Used by both GET and POST
+                                                      # trace file for aci_replay, None disables recording
+        self.record = os.environ.get("ANSIBLE_ACI_RECORD")
+        self.compress = False                         # gzip the body of genericPOST
+        self.max_content = None                       # most bytes of a response kept in content, None is no limit
+        self.truncated = False                        # the last response was longer than max_content
+        self.content_bytes = 0                        # bytes read of the last response, including any beyond max_content
         return
 #
 #
@@ -59,13 +133,13 @@ class Connection(object):
         URL = "%s://%s/api/aaaLogout.xml" % (self.transport,self.controllername)
         XML = self.aaaLogout_XML_template % self.username
         try:
-            r = requests.post(URL, data=XML, cookies=self.cookie, headers=self.HEADER, verify=False)
+            r, content = self.request("POST", URL, XML, self.cookie)
         except:
             if self.debug:
                 print "aaaLogout failure XML: %s " % (XML)
             return(999)
         else:
-            self.content =  r.content.encode("utf-8")
+            self.content =  content
             self.creationTime = 0                          # when creationTime is zero, assume loggedout
         return r.status_code
 
@@ -87,7 +161,7 @@ class Connection(object):
         URL = "%s://%s/api/aaaLogin.xml" % (self.transport,self.controllername)
         XML = self.aaaLogin_XML_template % (self.username,self.password)
         try:
-            r = requests.post(URL, data=XML, headers=self.HEADER, verify=False)
+            r, content = self.request("POST", URL, XML)
         except requests.ConnectionError as e: 
             print "aaaLogin failure\nURL:\t%s \nXML:\t%s " % (URL, XML)
             return(999)
@@ -98,7 +172,7 @@ class Connection(object):
                print "aaaLogin failure\nURL:\t%s \nXML:\t%s " % (URL, XML)
                return(999)
            else:
-               self.content =  r.content.encode("utf-8")   
+               self.content =  content
                self.savecreationTime(self.content)
                self.saverefreshTimeoutSeconds(self.content)
                if self.debug: 
@@ -113,6 +187,21 @@ class Connection(object):
             otherwise, it has a interger timestame that will evaluate to true 
         """
         return self.creationTime
+#
+#
+#
+    def clone(self):
+        """ return a new Connection to the same controller with the settings and login session
+            (cookie) of this one, but its own URL, XML and content, so several threads can issue
+            requests on one login
+        """
+        other = Connection()
+        for attribute in ("debug", "transport", "controllername", "username", "password", "creationTime",
+                          "my_creationTime", "refreshTimeoutSeconds", "record", "compress", "max_content"):
+            setattr(other, attribute, getattr(self, attribute))
+        if self.cookie is not None:
+            other.cookie = dict(self.cookie)
+        return other
 # 
 #
 #
@@ -139,6 +228,125 @@ class Connection(object):
         self.debug = debugvalue
 #
 #
+#
+    def setRecord(self,filename):
+        """ sets the trace file every request and response is appended to, None disables recording.
+            Recording is also enabled by the environment variable ANSIBLE_ACI_RECORD, so a playbook
+            run can be captured without changing the modules.
+        """
+        self.record = filename
+#
+#
+#
+    def setCompress(self,compress):
+        """ gzip the body of genericPOST on the fly, sent with Content-Encoding: gzip """
+        self.compress = compress
+#
+#
+#
+    def setmax_content(self,max_content):
+        """ sets the most bytes of a response kept in content, None keeps the whole response """
+        self.max_content = max_content
+#
+#
+#
+    def request(self, method, URL, data=None, cookies=None, compress=False):
+        """ issue a REST call to the controller and return the response and its content.
+            The body may be a string, file object, memory-mapped file or generator (see body),
+            the response is read by read_content. When a trace file is set the call is recorded.
+        """
+        headers = self.HEADER
+        if compress and data is not None:
+            headers = dict(self.HEADER)
+            headers['content-encoding'] = "gzip"
+        if self.record:
+            try:
+                data_bytes = requests.utils.super_len(data)      # before the body is consumed
+            except Exception:
+                data_bytes = None
+        start = time.time()
+        r = requests.request(method, URL, data=self.body(data, compress), cookies=cookies, headers=headers,
+                             verify=False, stream=True)
+        content = self.read_content(r)
+        if self.record:
+            self.record_exchange(method, URL, data, data_bytes, r.status_code, content, start, time.time())
+        return r, content
+#
+#
+#
+    def body(self, data, compress=False):
+        """ the request body as given to requests. Strings and file objects are passed unchanged, a
+            file is streamed from disk. A memory-mapped file is sent chunked, as is any body with compress,
+            which is gzip compressed on the fly. Generators are sent chunked by requests.
+        """
+        if data is None:
+            return None
+        if compress:
+            return gzip_chunks(chunks(data))
+        if isinstance(data, mmap.mmap):
+            return chunks(data)
+        return data
+#
+#
+#
+    def read_content(self, r):
+        """ read the response in CHUNK_SIZE pieces, keeping at most max_content bytes. Sets
+            truncated when the response was longer. When recording, the rest of a truncated
+            response is still read and counted in content_bytes, so the trace holds its real
+            size and transfer time; otherwise reading stops at the cap
+        """
+        self.truncated = False
+        pieces = []
+        size = 0
+        try:
+            for chunk in r.iter_content(CHUNK_SIZE):
+                if self.truncated:
+                    size += len(chunk)
+                    continue
+                if self.max_content is not None and size + len(chunk) > self.max_content:
+                    pieces.append(chunk[:self.max_content - size])
+                    self.truncated = True
+                    size += len(chunk)
+                    if not self.record:
+                        break
+                    continue
+                pieces.append(chunk)
+                size += len(chunk)
+        finally:
+            r.close()
+        self.content_bytes = size
+        return "".join(pieces)
+#
+#
+#
+    def record_exchange(self, method, URL, data, data_bytes, status_code, content, start, end):
+        """ append one request and its response to the trace file as a JSON line. Passwords and
+            session tokens are replaced, the cookie is not recorded. Failing to record never
+            fails the REST call.
+        """
+        path = URL.split("://", 1)[-1]
+        path = path[path.find("/"):] if "/" in path else "/"
+        trace = dict(time=round(start, 6),
+                     elapsed=round(end - start, 6),
+                     controller=self.controllername,
+                     method=method,
+                     path=path,
+                     request=SANITIZE.sub(r'\1******\2', data if isinstance(data, basestring) else ""),
+                     request_bytes=data_bytes,
+                     status=status_code,
+                     response=SANITIZE.sub(r'\1******\2', content or ""),
+                     response_bytes=self.content_bytes,
+                     truncated=self.truncated)
+        try:
+            with record_lock:
+                with open(self.record, "a") as tracefo:
+                    fcntl.flock(tracefo, fcntl.LOCK_EX)        # forked modules append to the same trace,
+                    tracefo.write(json.dumps(trace) + "\n")   # the lock is released when the file closes
+        except (IOError, OSError, ValueError) as e:
+            if self.debug:
+                print "record failure\nfile:\t%s \nerror:\t%s" % (self.record, e)
+#
+#
 #
     def parsecontent(self,content,string):
        """
@@ -173,7 +381,9 @@ class Connection(object):
 #
 #
     def setgeneric_XML(self,XML):
-        """ sets the generic XML template """
+        """ sets the generic XML template, a string or for large bodies a file object,
+            memory-mapped file or generator which genericPOST streams
+        """
         self.generic_XML  = XML  
 #
 #
@@ -189,12 +399,12 @@ class Connection(object):
         URL = self.generic_URL % (self.transport,self.controllername)
         self.content = None
         try:
-            r = requests.post(URL, data=self.generic_XML, cookies=self.cookie, headers=self.HEADER, verify=False)
+            r, content = self.request("POST", URL, self.generic_XML, self.cookie, self.compress)
         except requests.ConnectionError as e: 
             print "genericPOST failure\nURL:\t%s \nXML:\t%s " % (URL, self.generic_XML)
             return(999)
         else:
-            self.content =  r.content.encode("utf-8")
+            self.content =  content
             if self.debug: 
                print "genericPOST\nstatus_code:\t%s \nurl:\t%s \ncontent:\t%s \nXML:\t%s" % \
                      (r.status_code, r.url, self.content, self.generic_XML)            
@@ -207,12 +417,12 @@ class Connection(object):
         URL = self.generic_URL % (self.transport, self.controllername)
         self.content = None
         try:
-            r = requests.get(URL, cookies=self.cookie, headers=self.HEADER, verify=False)
+            r, content = self.request("GET", URL, None, self.cookie)
         except requests.ConnectionError as e: 
             print "genericGET failure\nURL:\t%s " % (URL)
             return(999)
         else:
-            self.content =  r.content.encode("utf-8")
+            self.content =  content
             if self.debug: 
                print "genericGET\nstatus_code:\t%s \nurl:\t%s \ncontent:\t%s " % \
                      (r.status_code, r.url, self.content)            
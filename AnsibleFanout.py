@@ -0,0 +1,55 @@
+#
+#  AnsibleFanout.py
+#
+"""
+   Runs one task per device concurrently for the modules which take a list of hosts
+   (aci_clone_tenant, nxos_batch_config, netconf_batch_config) and summarizes the result
+
+   The task is a function of one argument returning (host, report), where report is a
+   dictionary with at least changed and elapsed, and error when the device failed.
+
+# Version     Date           Comments
+# ----------- ------------   -------------------------------------------------
+# 1.0        19 Oct   2026   initial release, from the per module copies
+"""
+from multiprocessing.pool import ThreadPool
+
+
+def unique(hosts):
+    " the hosts in the order given, without duplicates "
+    result = []
+    for host in hosts:
+        if host not in result:
+            result.append(host)
+    return result
+
+
+def fan_out(function, work, forks):
+    """ call the function for each element of work, at most forks at a time.
+        Returns a dictionary of the reports keyed by host
+    """
+    pool = ThreadPool(max(1, min(forks, len(work))))
+    try:
+        reports = pool.map(function, work)
+    finally:
+        pool.close()
+        pool.join()
+    return dict(reports)
+
+
+def summarize(hosts, reports):
+    " return whether any device changed and the list of hosts which failed "
+    changed = any(report["changed"] for report in reports.values())
+    failed = [host for host in hosts if "error" in reports[host]]
+    return changed, failed
+
+
+def log_reports(logger, hosts, reports, fields):
+    """ log one line per device, fields is a list of (NAME, function) adding NAME=function(report)
+        between the changed flag and the elapsed time
+    """
+    for host in hosts:
+        report = reports[host]
+        values = " ".join(["%s=%s" % (name, function(report)) for name, function in fields])
+        logger.info('DEVICE=%s CHANGED=%s %s ELAPSED=%s ERROR=%s' % (host, report["changed"], values,
+                    report["elapsed"], report.get("error")))
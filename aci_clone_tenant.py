@@ -12,6 +12,10 @@
      25 January 2016  |  1.1 - further tweeks on XML to repost
      26 January 2016  |  1.2 - only delete statsHierColl
       2 Febr    2016  |  2.0 - added ihost and ohost to move between fabrics
+     19 October 2026  |  2.1 - ohost accepts a list of fabrics, the clone is posted to them concurrently
+                          2.2 - optional gzip of the posted tenant, size capped response
+                          2.3 - cache of prepared templates, validated by the template version on the APIC
+                          2.4 - sharded mode, the tenant is posted in size bounded pieces in dependency order
 
 """
 DOCUMENTATION = '''
@@ -20,7 +24,7 @@ DOCUMENTATION = '''
 
 module: aci_clone_tenant
 author: Mayank Nauni
-version_added: "2.0"
+version_added: "2.4"
 short_description: Clones a tenant using the northbound interface of a Cisco ACI controller (APIC)
 
 description:
@@ -29,7 +33,7 @@ description:
       separate ACI fabrics by specifing a different host name or IP address for ihost and ohost.
 
 requirements:
-    - AnsibleACI module
+    - AnsibleACI and AnsibleFanout modules
 
 options:
     ihost:
@@ -38,8 +42,14 @@ options:
         required: true
     ohost:
         description:
-            - The IP address or hostname of the APIC to write the clone 
+            - The IP address or hostname of the APIC to write the clone, or a list of them. The template
+              is read and modified once, then posted to every fabric in the list concurrently.
         required: true
+    forks:
+        description:
+            - Maximum number of fabrics posted to at the same time.
+        required: false
+        default: 4
     username:
         description:
             - Login username of the APIC
@@ -60,6 +70,41 @@ options:
         description:
             - A switch to enable debug. Use a value of 'on' to enable.
         required: false
+    compress:
+        description:
+            - Gzip the tenant XML while it is posted (Content-Encoding gzip, chunked transfer).
+        required: false
+        default: false
+    cache_dir:
+        description:
+            - Directory to keep prepared copies of template tenants. Before each clone the template's modTs and its
+              latest audit record are queried; when they match the cached copy the full template is neither
+              downloaded nor processed again. Copies are kept per username, for the user's RBAC scope.
+        required: false
+    cache_size:
+        description:
+            - Most bytes of templates kept in cache_dir, the least recently used are removed first.
+        required: false
+        default: 67108864
+    shard:
+        description:
+            - Post a large tenant in pieces rather than in one request. The fvTenant is created first, then its
+              children are posted in tiers so objects are created before the objects relating to them: contexts,
+              filters and policies, then bridge domains, contracts and L3 outs, then application profiles, and
+              last the tenant's own relations. Each tier is split into shards of at most shard_size bytes which
+              are posted in parallel, the next tier starting when all shards of the tier succeeded.
+        required: false
+        default: false
+    shard_size:
+        description:
+            - Most bytes of XML in a shard. An object larger than this is split over several shards by its children.
+        required: false
+        default: 262144
+    shard_forks:
+        description:
+            - Maximum number of shards of a fabric posted at the same time.
+        required: false
+        default: 4
 
 '''
 
@@ -79,20 +124,80 @@ EXAMPLES = '''
      tenant: xStart
 
 
+  - name: Roll out a standard tenant to several fabrics
+    aci_clone_tenant:
+     ihost:  "{{inventory_hostname}}"
+     ohost:
+       - 192.0.2.1
+       - 192.0.2.2
+       - 192.0.2.3
+     forks: 3
+     username:  kingjoe
+     password: "{{password}}"
+     descr: Standard tenant
+     template: mediaWIKI
+     tenant: xStart
+    register: clone
+
+  - debug: var=clone.fabrics
+
+  - name: Clone from a cached copy of the template, when it has not changed since the last clone
+    aci_clone_tenant:
+     ihost:  "{{inventory_hostname}}"
+     ohost:  "{{inventory_hostname}}"
+     username:  kingjoe
+     password: "{{password}}"
+     descr: Example of cloning a tenant from a cached template
+     template: mediaWIKI
+     tenant: xStart
+     cache_dir: /tmp/aci_cache
+
+  - name: Clone a large tenant in shards, to stay within the APIC request timeout
+    aci_clone_tenant:
+     ihost:  "{{inventory_hostname}}"
+     ohost:  "{{inventory_hostname}}"
+     username:  kingjoe
+     password: "{{password}}"
+     descr: Example of a sharded clone
+     template: mediaWIKI
+     tenant: xStart
+     shard: yes
+     shard_size: 131072
+
+   Each fabric is reported with its status code, changed flag, elapsed seconds and any error:
+
+     "fabrics": {"192.0.2.1": {"changed": true, "elapsed": 2.41, "status": 200}, ...}
 
 '''
 
 #
+import os
 import sys
+import glob
+import json
 import time
 import xml.etree.ElementTree as ET
 import logging
+from multiprocessing.pool import ThreadPool
+
+import requests
 
 try:
     import AnsibleACI
+    import AnsibleFanout
 except ImportError:
     sys.path.append("/usr/share/ansible")
     import AnsibleACI
+    import AnsibleFanout
+
+MAX_RESPONSE = 16777216                                    # most bytes of a POST response kept to find the changed flag
+SHARD_TIERS = [                                            # children of fvTenant, by what they relate to
+    [],                                                    # contexts, filters and other policies, anything not below
+    ["fvBD", "vzBrCP", "vzCPIf", "l3extOut", "vzTaboo"],   # relate to contexts, filters and policies
+    ["fvAp"],                                              # EPGs relate to bridge domains and contracts
+    ["fvRs"],                                              # relations of the tenant itself, by class prefix
+]
+AUDIT_QUERY = "?rsp-subtree-include=audit-logs,no-scoped,subtree&order-by=aaaModLR.created|desc&page-size=1"
 
 
 def get_tenant(cntrl, tenant):
@@ -111,6 +216,105 @@ def get_tenant(cntrl, tenant):
 
 
 
+def get_stamp(cntrl, tenant):
+    """ the version of the tenant on the controller, its modTs and the id of the latest audit record
+        of its subtree, as a change below the tenant does not update the tenant's own modTs.
+        Returns None if either can not be read
+    """
+    if cntrl.aaaLogin() != 200:
+        return None
+
+    stamp = []
+    for query in ("", AUDIT_QUERY):
+        cntrl.setgeneric_URL("%s://%s" + "/api/mo/uni/tn-%s.xml" % tenant + query)
+        if cntrl.genericGET() != 200:
+            break
+        try:
+            root = ET.fromstring(cntrl.get_content())
+        except ET.ParseError:
+            break
+        mo = root.find("fvTenant") if not query else root.find("aaaModLR")
+        if mo is None:
+            break
+        stamp.append(mo.attrib.get("modTs") if not query else mo.attrib.get("id"))
+    cntrl.aaaLogout()
+
+    if len(stamp) != 2:
+        return None
+    return "|".join(stamp)
+
+
+
+def cache_file(cache_dir, host, username, template):
+    """ the file holding the prepared copy of a template tenant from the given controller. The copy
+        is kept per user, an APIC user's RBAC scope limits which objects of the tenant are returned
+    """
+    return os.path.join(cache_dir, "%s_%s_tn-%s.json" % (host, username, template))
+
+
+
+def read_template(cache_dir, host, username, template, stamp):
+    """ return the prepared template saved with the same stamp, or None. A copy that is used
+        has its modification time updated, which orders the files for eviction
+    """
+    filename = cache_file(cache_dir, host, username, template)
+    try:
+        with open(filename, "r") as cachefo:
+            entry = json.load(cachefo)
+        if entry["stamp"] != stamp:
+            return None
+        os.utime(filename, None)
+        return entry["xml"]
+    except (IOError, OSError, ValueError, KeyError):
+        return None
+
+
+
+def write_template(cache_dir, host, username, template, stamp, xml, cache_size):
+    " save the prepared template, then remove the least recently used copies above cache_size bytes "
+    try:
+        AnsibleACI.write_atomic(cache_file(cache_dir, host, username, template), json.dumps(dict(stamp=stamp, xml=xml)))
+
+        entries = []
+        for filename in glob.glob(os.path.join(cache_dir, "*_tn-*.json")):
+            try:
+                entries.append((os.path.getmtime(filename), os.path.getsize(filename), filename))
+            except OSError:
+                pass                                           # removed by a concurrent run
+        total = sum([size for mtime, size, filename in entries])
+        for mtime, size, filename in sorted(entries)[:-1]:     # never the newest, the one just written
+            if total <= cache_size:
+                break
+            os.remove(filename)
+            total -= size
+    except (IOError, OSError):
+        pass                                                   # the cache is an optimisation only
+
+
+
+def get_template(cntrl, username, template, cache_dir, cache_size):
+    """ the template tenant ready to personalise, from cache_dir when its stamp on the controller
+        has not changed. Returns the xml, the status code and where the template came from;
+        the xml is None when the controller answered but has no such tenant
+    """
+    stamp = None
+    if cache_dir:
+        stamp = get_stamp(cntrl, template)
+        if stamp:
+            xml = read_template(cache_dir, cntrl.controllername, username, template, stamp)
+            if xml is not None:
+                return xml, 200, "cache"
+
+    xml_string, retcode = get_tenant(cntrl, template)
+    if retcode != 200:
+        return xml_string, retcode, "controller"
+    xml = prepare_template(xml_string)
+    if xml is not None and stamp:
+        write_template(cache_dir, cntrl.controllername, username, template, stamp, xml, cache_size)
+    return xml, retcode, "controller"
+
+
+
 def post_tenant(cntrl, xml):
     " post the modified xml to create a new tenant from the template"
     
@@ -118,6 +322,7 @@ def post_tenant(cntrl, xml):
     if retcode != 200:
         return "post_tenant: Unable to login to controller", retcode
     cntrl.setgeneric_XML(xml)
+    cntrl.setmax_content(MAX_RESPONSE)
     cntrl.setgeneric_URL("%s://%s/api/mo/uni.xml?rsp-subtree=modified")
     retcode = cntrl.genericPOST()
     post_content = cntrl.get_content()
@@ -127,6 +332,106 @@ def post_tenant(cntrl, xml):
 
 
 
+def shard_tier(element):
+    " the index of the SHARD_TIERS entry for a child of the tenant "
+    for index, classes in enumerate(SHARD_TIERS):
+        for name in classes:
+            if element.tag == name or (name == "fvRs" and element.tag.startswith(name)):
+                return index
+    return 0
+
+
+
+def split_element(element, shard_size):
+    """ return copies of the element, each with some of its children, so every copy is at most
+        shard_size bytes. The children are split in turn when one alone is too large; an element
+        without children is returned whole whatever its size
+    """
+    if len(ET.tostring(element)) <= shard_size or len(element) == 0:
+        return [element]
+
+    pieces = []
+    current = None
+    length = 0
+    empty = len(ET.tostring(ET.Element(element.tag, element.attrib))) * 2
+    for child in element:
+        for part in split_element(child, shard_size - empty):
+            part_length = len(ET.tostring(part))
+            if current is None or length + part_length > shard_size:
+                current = ET.Element(element.tag, element.attrib)
+                pieces.append(current)
+                length = empty
+            current.append(part)
+            length += part_length
+    return pieces
+
+
+
+def shard_xml(xml, shard_size):
+    """ split the tenant XML for a sharded post. Returns the fvTenant shell, its attributes without
+        children, and a list of tiers, each a list of shard XML strings to post in parallel
+    """
+    root = ET.fromstring(xml)
+    shell = ET.Element(root.tag, root.attrib)
+
+    tiers = []
+    for index in range(len(SHARD_TIERS)):
+        wrapper = ET.Element(root.tag, name=root.attrib["name"])
+        wrapper.extend([child for child in root if shard_tier(child) == index])
+        if len(wrapper):
+            tiers.append([ET.tostring(shard, encoding="us-ascii", method="xml")
+                          for shard in split_element(wrapper, shard_size)])
+    return ET.tostring(shell, encoding="us-ascii", method="xml"), tiers
+
+
+
+def post_shard(args):
+    """ post one shard on a clone of the logged in connection, run by the thread pool
+        in post_sharded
+    """
+    cntrl, xml = args
+    cntrl = cntrl.clone()
+    cntrl.setgeneric_XML(xml)
+    cntrl.setgeneric_URL("%s://%s/api/mo/uni.xml?rsp-subtree=modified")
+    retcode = cntrl.genericPOST()
+    return retcode, cntrl.get_content()
+
+
+
+def post_sharded(cntrl, xml, shard_size, forks):
+    """ post the tenant shell, then each tier of shards with at most forks in parallel, stopping at
+        the first tier with a failed shard. Returns (changed, content, retcode, shards), where content
+        is the response of the failed shard, if any, and shards the number posted
+    """
+    shell, tiers = shard_xml(xml, shard_size)
+
+    retcode = cntrl.aaaLogin()
+    if retcode != 200:
+        return False, "post_sharded: Unable to login to controller", retcode, 0
+    cntrl.setmax_content(MAX_RESPONSE)
+
+    changed = False
+    shards = 0
+    pool = ThreadPool(max(1, forks))
+    try:
+        for tier in [[shell]] + tiers:
+            results = pool.map(post_shard, [(cntrl, shard) for shard in tier])
+            shards += len(tier)
+            for retcode, content in results:
+                if retcode == 200 and get_changed_flag(content):
+                    changed = True
+            for retcode, content in results:
+                if retcode != 200:
+                    return changed, content, retcode, shards
+    finally:
+        pool.close()
+        pool.join()
+        cntrl.aaaLogout()
+
+    return changed, None, 200, shards
+
+
+
 def get_changed_flag(content):
     "determine if we have change the APIC configuration"
 
@@ -144,18 +449,37 @@ def modify_xml(xml_string, template, new_tenant_name, description):
         eliminate the imdata wrapper the drawing configuration and add a description to the tenant
         to indicate what tenant it was configured from and when.
     """
-    xml_string = remove_imdata(xml_string)
+    xml_string = prepare_template(xml_string)
+    if xml_string is None:
+        return  "The server returned status code of 200, but no data, typical of missing template tenant"
+    return personalize_xml(xml_string, template, new_tenant_name, description)
+
+
+
+def personalize_xml(xml_string, template, new_tenant_name, description):
+    " rename a prepared template to the new tenant and set its description "
+
     # need to replace all references of the template tenant with the new tenant name
     xml_string = xml_string.replace('uni/tn-%s' % template ,'uni/tn-%s' % new_tenant_name)
-
-    try:
-        root = ET.fromstring(xml_string)
-    except ET.ParseError:
-        return  "The server returned status code of 200, but no data, typical of missing template tenant"
+    root = ET.fromstring(xml_string)
 
     # Set the name of the new tenant, and add a description
     root.attrib['descr'] = description
     root.attrib['name'] = new_tenant_name
+    return ET.tostring(root, encoding="us-ascii", method="xml")
+
+
+
+def prepare_template(xml_string):
+    """ the part of modify_xml which does not depend on the new tenant, and so can be cached:
+        remove the imdata wrapper, the drawing configuration and statsHierColl. Returns None
+        when there is no tenant in the response
+    """
+    xml_string = remove_imdata(xml_string)
+    try:
+        root = ET.fromstring(xml_string)
+    except ET.ParseError:
+        return None
 
     # Delete all the drawCont 
     for item in root.findall('drawCont'):    
@@ -182,6 +506,43 @@ def remove_imdata(xml):
 
 
 
+def post_fabric(args):
+    """ post the cloned tenant to one fabric and return a report of the result,
+        run by the thread pool in post_fabrics
+    """
+    host, xml, params = args
+    start = time.time()
+    report = dict(status=None, changed=False)
+
+    try:
+        cntrl = get_connection_object(host, params["username"], params["password"], params["debug"])
+        cntrl.setCompress(params["compress"])
+        if params["shard"]:
+            changed, content, retcode, shards = post_sharded(cntrl, xml, params["shard_size"], params["shard_forks"])
+            report.update(status=retcode, changed=changed, shards=shards)
+        else:
+            content, retcode = post_tenant(cntrl, xml)
+            report["status"] = retcode
+            if retcode == 200:
+                report["changed"] = get_changed_flag(content)
+        if retcode != 200:
+            report["error"] = content or "unable to connect to controller"
+    except (requests.RequestException, ET.ParseError) as e:  # bad host names, transport errors, malformed XML
+        report["error"] = "%s: %s" % (e.__class__.__name__, e)
+
+    report["elapsed"] = round(time.time() - start, 3)
+    return host, report
+
+
+
+def post_fabrics(hosts, xml, params):
+    """ post the cloned tenant to each fabric, at most forks at a time.
+        Returns a dictionary of the report for each fabric, keyed by host
+    """
+    return AnsibleFanout.fan_out(post_fabric, [(host, xml, params) for host in hosts], params["forks"])
+
+
+
 def get_connection_object(host, username, password, debug):
     " Create an Connection object for the controller and set parameters "
 
@@ -205,10 +566,17 @@ def main():
             descr = dict(required=True),
             tenant = dict(required=True),
             ihost = dict(required=True),
-            ohost = dict(required=True),
+            ohost = dict(required=True, type='list'),
+            forks = dict(required=False, default=4, type='int'),
             username = dict(required=True),
             password  = dict(required=True),
-            debug = dict(required=False, default=False, type='bool')
+            debug = dict(required=False, default=False, type='bool'),
+            compress = dict(required=False, default=False, type='bool'),
+            cache_dir = dict(required=False),
+            cache_size = dict(required=False, default=67108864, type='int'),
+            shard = dict(required=False, default=False, type='bool'),
+            shard_size = dict(required=False, default=262144, type='int'),
+            shard_forks = dict(required=False, default=4, type='int')
          ),
         check_invalid_arguments=False,
         add_file_common_args=True
@@ -221,17 +589,23 @@ def main():
     
     # Connect to the controller where the template resides
     cntrl = get_connection_object(module.params["ihost"], username, password, debug)
-    xml_string, retcode = get_tenant(cntrl, module.params["template"])
+    xml_string, retcode, source = get_template(cntrl, username, module.params["template"], module.params["cache_dir"],
+                                               module.params["cache_size"])
     
-    if retcode == 200:
-        # modify and create the cloned template on the target APIC
-        new_xml = modify_xml(xml_string, module.params["template"], module.params["tenant"], module.params["descr"])
-        cntrl = get_connection_object(module.params["ohost"], username, password, debug)
-        content, retcode = post_tenant(cntrl, new_xml)
-        if retcode == 200:
-        	module.exit_json(changed=get_changed_flag(content), content=retcode)
+    if retcode == 200 and xml_string is None:
+        module.fail_json(msg="The server returned status code of 200, but no data, typical of missing template tenant %s"
+                         % module.params["template"])
+    elif retcode == 200:
+        # modify once, then create the cloned template on each target APIC
+        new_xml = personalize_xml(xml_string, module.params["template"], module.params["tenant"], module.params["descr"])
+        ohosts = AnsibleFanout.unique(module.params["ohost"])
+        fabrics = post_fabrics(ohosts, new_xml, module.params)
+        changed, failed = AnsibleFanout.summarize(ohosts, fabrics)
+        if not failed:
+            module.exit_json(changed=changed, content=retcode, fabrics=fabrics, template_source=source)
         else:
-            module.fail_json(msg="%s %s %s %s" % (retcode, "failed to post tenant", module.params["tenant"], xml_string))
+            module.fail_json(msg="%s %s %s" % ("failed to post tenant", module.params["tenant"], ", ".join(failed)),
+                             changed=changed, fabrics=fabrics, template_source=source)
     else:
     	module.fail_json(msg="%s %s %s %s" % (retcode, "failed to get tenant", module.params["tenant"], xml_string))
   
@@ -0,0 +1,328 @@
+#!/usr/bin/env python
+
+"""
+     Standalone collector of APIC class queries across every controller in an inventory
+
+     Runs the class queries of aci_gather_facts against all APICs of an inventory group
+     outside of ansible-playbook, it needs only AnsibleACI and ACIFormat. Each controller is
+     queried by its own worker threads (I/O), the responses are parsed by a process pool using
+     the aci_gather_facts formatting (ACIFormat), and every MO is streamed as one JSON line to
+     a compressed file per controller:
+
+         <output>/<host>.jsonl.gz
+
+         {"host": "10.180.0.65", "uri": "/api/class/fvCEp.json", "class": "fvCEp", "attributes": {...}}
+
+     Queries are paged (page-size), so memory stays bounded by the number of workers times
+     the page size, regardless of the number of fabrics or objects.
+
+     Revision history:
+     19 October 2026  |  1.0 - initial release
+
+     Usage:
+
+       ./aci_collect_facts.py -i hosts -g apic -c fvTenant -c fvCEp -o /tmp/audit
+
+       $ cat queries.txt
+       # URI or class name, optionally followed by a query-target-filter
+       fvTenant
+       /api/class/compVm.json eq(compVm.state,"poweredOn")
+
+       ./aci_collect_facts.py -i hosts -g apic -q queries.txt --processes 4 --per-host 2
+
+"""
+
+import os
+import sys
+import time
+import json
+import gzip
+import Queue
+import getpass
+import argparse
+import threading
+import multiprocessing
+from multiprocessing.pool import ThreadPool
+
+try:
+    import AnsibleACI
+    import ACIFormat
+except ImportError:
+    sys.path.append("/usr/share/ansible")
+    import AnsibleACI
+    import ACIFormat
+
+
+# ---------------------------------------------------------------------------
+# INVENTORY
+# ---------------------------------------------------------------------------
+
+def read_inventory(filename):
+    """ read an Ansible INI inventory, returns (groups, group_vars, host_vars) where groups maps
+        a group to its hosts and child groups, e.g. the hosts file of this repository:
+
+        [apic]
+        10.180.0.65
+        [apic:vars]
+        aci_username = admin
+    """
+    groups = {}
+    group_vars = {}
+    host_vars = {}
+    section, kind = "ungrouped", "hosts"
+    with open(filename, "r") as inventory:
+        for line in inventory:
+            line = line.split("#")[0].strip()
+            if not line or line.startswith(";"):
+                continue
+            if line.startswith("[") and line.endswith("]"):
+                section, _, kind = line[1:-1].partition(":")
+                kind = kind or "hosts"
+                groups.setdefault(section, {"hosts": [], "children": []})
+                continue
+            group = groups.setdefault(section, {"hosts": [], "children": []})
+            if kind == "vars":
+                key, _, value = line.partition("=")
+                group_vars.setdefault(section, {})[key.strip()] = value.strip()
+            elif kind == "children":
+                group["children"].append(line)
+            else:
+                fields = line.split()
+                group["hosts"].append(fields[0])
+                for field in fields[1:]:
+                    key, _, value = field.partition("=")
+                    host_vars.setdefault(fields[0], {})[key] = value
+    return groups, group_vars, host_vars
+
+
+def group_hosts(inventory, group, inherited=None):
+    """ return a list of (host, variables) for a group and its children, host variables
+        take precedence over those of the group
+    """
+    groups, group_vars, host_vars = inventory
+    variables = dict(inherited or {})
+    variables.update(group_vars.get(group, {}))
+    hosts = []
+    for host in groups.get(group, {}).get("hosts", []):
+        merged = dict(variables)
+        merged.update(host_vars.get(host, {}))
+        hosts.append((host, merged))
+    for child in groups.get(group, {}).get("children", []):
+        hosts.extend(group_hosts(inventory, child, variables))
+    return hosts
+
+
+def read_queries(filename):
+    " read query lines, a URI or class name optionally followed by a filter, skipping comments "
+    queries = []
+    with open(filename, "r") as queryfo:
+        for line in queryfo:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                uri, _, queryfilter = line.partition(" ")
+                queries.append(make_query(uri, queryfilter.strip()))
+    return queries
+
+
+def make_query(uri, queryfilter=None):
+    " a (URI, filter) query, a bare class name is turned into a class query URI "
+    if "/" not in uri:
+        uri = "/api/class/%s.json" % uri
+    return (uri, queryfilter or None)
+
+
+# ---------------------------------------------------------------------------
+# PARSE
+# ---------------------------------------------------------------------------
+
+def parse_page(args):
+    """ parse one page of a query in the process pool, returns the number of MOs on the page
+        and a JSON line for each MO (and each child, if the query returned a subtree)
+    """
+    host, uri, content = args
+    imdata = json.loads(content)["imdata"]
+    facts = ACIFormat.format_imdata(imdata)["ansible_facts"]
+    lines = []
+    for aci_class, mos in facts.items():
+        for attributes in mos:
+            lines.append(json.dumps({"host": host, "uri": uri, "class": aci_class, "attributes": attributes}))
+    return len(imdata), lines
+
+
+# ---------------------------------------------------------------------------
+# COLLECT
+# ---------------------------------------------------------------------------
+
+class Collector(object):
+    """
+      Collects the queries from one controller with per_host worker threads, each holding
+      its own logged in Connection, and writes the MOs to the host's compressed file
+    """
+    def __init__(self, host, variables, options, pool):
+        self.host = host
+        self.address = variables.get("aci_hostname", host)
+        self.username = options.username or variables.get("aci_username")
+        self.password = options.password or variables.get("aci_password")
+        self.options = options
+        self.pool = pool
+        self.lock = threading.Lock()                       # serializes writes to the output file
+        self.mos = 0
+        self.errors = []
+
+    def connection(self):
+        " a new Connection to the controller, logged in "
+        cntrl = AnsibleACI.Connection()
+        cntrl.setcontrollerIP(self.address)
+        cntrl.setUsername(self.username)
+        cntrl.setPassword(self.password)
+        if cntrl.aaaLogin() != 200:
+            return None
+        return cntrl
+
+    def get(self, cntrl, url):
+        " issue the GET, logging in again once if the session has expired "
+        cntrl.setgeneric_URL(url)
+        rc = cntrl.genericGET()
+        if rc in (401, 403) and cntrl.aaaLogin() == 200:
+            rc = cntrl.genericGET()
+        return rc
+
+    def query(self, cntrl, output, uri, queryfilter):
+        " page through one query, parsing each page in the process pool and streaming it to the output "
+        options = []
+        if queryfilter:
+            options.append("query-target-filter=" + queryfilter)
+        aci_class = ACIFormat.uri_class(uri)
+        if aci_class:
+            options.append("order-by=%s.dn" % aci_class)  # a stable order between pages
+        options.append("page-size=%s" % self.options.page_size)
+
+        page = 0
+        while True:
+            url = "%s://%s" + uri + "?" + "&".join(options + ["page=%s" % page])
+            rc = self.get(cntrl, url)
+            if rc != 200:
+                with self.lock:
+                    self.errors.append("%s %s: %s" % (uri, queryfilter or "", rc))
+                return
+            count, lines = self.pool.apply(parse_page, ((self.host, uri, cntrl.get_content()),))
+            cntrl.content = None                           # release the page before fetching the next
+            with self.lock:
+                for line in lines:
+                    output.write(line + "\n")
+                self.mos += len(lines)
+            if count < self.options.page_size:
+                return
+            page += 1
+
+    def worker(self, queries, output):
+        """ take queries from the queue until it is empty. A query that raises is recorded
+            in errors and the worker moves on to the next
+        """
+        reason = ""
+        try:
+            cntrl = self.connection()
+        except Exception as e:                             # e.g. an invalid aci_hostname
+            cntrl = None
+            reason = ", %s: %s" % (e.__class__.__name__, e)
+        if cntrl is None:
+            with self.lock:
+                self.errors.append("unable to login to controller %s%s" % (self.address, reason))
+            return
+        try:
+            while True:
+                try:
+                    uri, queryfilter = queries.get_nowait()
+                except Queue.Empty:
+                    return
+                try:
+                    self.query(cntrl, output, uri, queryfilter)
+                except Exception as e:                     # transport errors, a page parse_page can not decode
+                    with self.lock:
+                        self.errors.append("%s %s: %s" % (uri, queryfilter or "", "%s: %s" % (e.__class__.__name__, e)))
+        finally:
+            cntrl.aaaLogout()
+
+    def run(self, queries):
+        " collect all queries from this controller, returns a summary "
+        start = time.time()
+        work = Queue.Queue()
+        for query in queries:
+            work.put(query)
+
+        filename = os.path.join(self.options.output, "%s.jsonl.gz" % self.host)
+        output = gzip.open(filename, "wb")
+        try:
+            threads = [threading.Thread(target=self.worker, args=(work, output))
+                       for i in range(max(1, min(self.options.per_host, len(queries))))]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            output.close()
+
+        return dict(host=self.host, file=filename, mos=self.mos, errors=self.errors,
+                    elapsed=round(time.time() - start, 3))
+
+
+def collect(args):
+    " run the collector of one controller, used by the host thread pool "
+    host, variables, options, pool, queries = args
+    return Collector(host, variables, options, pool).run(queries)
+
+
+# ---------------------------------------------------------------------------
+# MAIN
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Collect APIC class queries from every controller of an inventory group")
+    parser.add_argument("-i", "--inventory", default="hosts", help="Ansible INI inventory (default: hosts)")
+    parser.add_argument("-g", "--group", default="apic", help="inventory group of the controllers (default: apic)")
+    parser.add_argument("-c", "--class", dest="classes", action="append", default=[], help="class to query, may be repeated")
+    parser.add_argument("-q", "--queries", help="file of queries, one URI or class and optional filter per line")
+    parser.add_argument("-o", "--output", default=".", help="directory for the <host>.jsonl.gz files")
+    parser.add_argument("-u", "--username", help="overrides aci_username of the inventory")
+    parser.add_argument("-p", "--password", help="overrides aci_password of the inventory, prompted if neither is set")
+    parser.add_argument("--processes", type=int, default=multiprocessing.cpu_count(), help="parsing processes")
+    parser.add_argument("--hosts", type=int, default=8, help="controllers queried at the same time")
+    parser.add_argument("--per-host", dest="per_host", type=int, default=2, help="concurrent requests per controller")
+    parser.add_argument("--page-size", dest="page_size", type=int, default=10000, help="MOs per request")
+    options = parser.parse_args()
+
+    queries = [make_query(aci_class) for aci_class in options.classes]
+    if options.queries:
+        queries.extend(read_queries(options.queries))
+    if not queries:
+        parser.error("no queries, use --class or --queries")
+
+    hosts = group_hosts(read_inventory(options.inventory), options.group)
+    if not hosts:
+        parser.error("no hosts in group %s of %s" % (options.group, options.inventory))
+    if not options.password and not all(variables.get("aci_password") for host, variables in hosts):
+        options.password = getpass.getpass("APIC password: ")
+    if not os.path.isdir(options.output):
+        os.makedirs(options.output)
+
+    pool = multiprocessing.Pool(max(1, options.processes))  # created before any thread is started
+    hostpool = ThreadPool(max(1, min(options.hosts, len(hosts))))
+    try:
+        summaries = hostpool.map(collect, [(host, variables, options, pool, queries) for host, variables in hosts])
+    finally:
+        hostpool.close()
+        hostpool.join()
+        pool.close()
+        pool.join()
+
+    failed = False
+    for summary in summaries:
+        sys.stdout.write("%(host)s %(mos)s MOs in %(elapsed)ss to %(file)s\n" % summary)
+        for error in summary["errors"]:
+            sys.stderr.write("%s ERROR %s\n" % (summary["host"], error))
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
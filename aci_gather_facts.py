@@ -12,6 +12,12 @@
      14 May   2015  |  1.4 - modification for running under Ansible Tower
      17 June  2015  |  1.5 - corrected cntrl.aaaLogout() placement
      3  Aug   2015  |  1.6 - added userid to log file name (ACI training class_Mayank_Nauni_V2.0)
+     19 Oct   2026  |  1.7 - answer filtered class queries from a local cache when a fresh copy exists
+                       1.8 - subtree queries, children are flattened into the per-class fact lists
+                       1.9 - count_only and exists modes return integer/boolean facts rather than MO lists
+                       2.0 - main() only runs when executed, so the module can be imported
+                       2.1 - columnar output format with dictionary encoding of low cardinality attributes
+                       2.2 - format_imdata, flatten and uri_class moved to ACIFormat, the local cache is kept per username
  
    
 """
@@ -20,7 +26,7 @@ DOCUMENTATION = '''
 ---
 module: aci_gather_facts
 author: Joel W. King, World Wide Technology
-version_added: "1.6"
+version_added: "2.2"
 short_description: query the APIC controller for facts about a specified class or managed object
 description:
     - This module issues a class or managed object query and returns the answer set as facts for use in a playbook
@@ -57,6 +63,57 @@ options:
             - The URL required by APIC to issue the request.
         required: true
 
+    subtree:
+        description:
+            - Include the subtree of the returned MOs (rsp-subtree). The nested children are flattened
+              into the same per-class lists a class query returns, each child carries a parent_dn key
+              holding the DN of the MO it was nested under.
+        required: false
+        choices: ['full', 'children']
+
+    subtree_class:
+        description:
+            - Comma separated list of classes to return from the subtree (rsp-subtree-class).
+        required: false
+
+    count_only:
+        description:
+            - Return only the number of matching MOs as the fact <class>_count (rsp-subtree-include=count),
+              the MOs themselves are not downloaded. MO queries use the name mo_count.
+        required: false
+        default: false
+
+    exists:
+        description:
+            - Return only whether any MO matches as the fact <class>_exists, a single MO is requested (page-size=1).
+        required: false
+        default: false
+
+    format:
+        description:
+            - Shape of the returned facts. list returns a list of attribute dictionaries per class. columnar
+              returns a table per class, the attribute names once in columns and each MO as a list of values
+              in rows. Attributes with few distinct values (e.g. encap, lcOwn, state) are dictionary encoded,
+              their values in rows are indexes into the list of values in dictionaries.
+              Use the aci_rows, aci_row, aci_lookup and aci_select filters in filter_plugins to read rows.
+        required: false
+        default: list
+        choices: ['list', 'columnar']
+
+    cache_dir:
+        description:
+            - Directory holding local copies of class queries. An unfiltered class query saves its answer
+              set here, a filtered query of the same class is then evaluated locally (see ACIFilter)
+              rather than sent to the APIC, as long as the copy is younger than cache_ttl. Copies are kept per
+              username, so a user with a restricted RBAC scope is never answered from another user's copy.
+        required: false
+
+    cache_ttl:
+        description:
+            - Age in seconds after which a local copy of a class is no longer used.
+        required: false
+        default: 300
+
 '''
 
 EXAMPLES = '''
@@ -114,8 +171,59 @@ EXAMPLES = '''
 
     $ ./bin/ansible-playbook aci_gather_facts.yml
 
+
+    Gather the EPGs, BDs, contexts, subnets and contracts of a tenant with a single request:
+
+      - name: Subtree query of tenant xStart
+        aci_gather_facts:
+          URI: /api/mo/uni/tn-xStart.json
+          subtree: full
+          subtree_class: fvAEPg,fvBD,fvCtx,fvSubnet,vzBrCP
+          host: "{{hostname}}"
+          username: admin
+          password: "{{password}}"
+
+      - name: debug bridge domains and the tenant they belong to
+        debug: msg="{{ item.name }} {{ item.parent_dn }}"
+        with_items: "{{ fvBD }}"
+
+
+    Conditions which only need a count or an existence test:
+
+      - name: Is the IP address known to the fabric
+        aci_gather_facts: URI=/api/class/fvCEp.json queryfilter=eq(fvCEp.ip,\"192.0.2.5\") exists=yes host={{hostname}} username=admin password={{password}}
+
+      - name: Number of powered on virtual machines
+        aci_gather_facts: URI=/api/class/compVm.json queryfilter=eq(compVm.state,\"poweredOn\") count_only=yes host={{hostname}} username=admin password={{password}}
+
+      - debug: msg="{{ compVm_count }} VMs, endpoint known {{ fvCEp_exists }}"
+
+
+    Large classes in the compact columnar format, read back with the filter plugins:
+
+      - name: All endpoints, columnar
+        aci_gather_facts: URI=/api/class/fvCEp.json format=columnar host={{hostname}} username=admin password={{password}}
+
+      - debug: msg="{{ fvCEp | aci_lookup('ip', '192.0.2.5') }} {{ fvCEp | aci_row(0) }}"
+
+      The fact is returned as:
+
+        "fvCEp": {"columns": ["dn", "encap", "ip", "mac", ...],
+                  "dictionaries": {"encap": ["vlan-100", "vlan-101"], ...},
+                  "rows": [["uni/tn-xStart/ap-web/epg-web/cep-00:50:56:9A:01:02", 0, "192.0.2.5", "00:50:56:9A:01:02", ...], ...]}
+
+
+    Snapshot the endpoints once, then answer any number of filtered queries locally:
+
+      - name: Class query for all endpoints, saved to the local cache
+        aci_gather_facts: URI=/api/class/fvCEp.json cache_dir=/tmp/aci_cache host={{hostname}} username=admin password={{password}}
+
+      - name: Endpoints in vlan-100, evaluated against the local copy
+        aci_gather_facts: URI=/api/class/fvCEp.json queryfilter=eq(fvCEp.encap,\"vlan-100\") cache_dir=/tmp/aci_cache host={{hostname}} username=admin password={{password}}
+
 '''
 
+import os
 import sys
 import time
 import logging
@@ -137,6 +245,13 @@ except ImportError:
     sys.path.append("/usr/share/ansible")
     import AnsibleACI
 
+try:
+    import ACIFilter
+    import ACIFormat
+except ImportError:
+    sys.path.append("/usr/share/ansible")
+    import ACIFilter
+    import ACIFormat
 
 # ---------------------------------------------------------------------------
 # LOGGING
@@ -155,17 +270,20 @@ logger.setLevel(logging.INFO)
 # PROCESS
 # ---------------------------------------------------------------------------
 
-def process(cntrl):
+def process(cntrl, formatter=None):
     """ We have all are variables and parameters set in the object, attempt to 
-        login and post the data to the APIC
+        login and post the data to the APIC. The formatter turns the content into
+        the facts returned, format_content unless specified.
     """
+    if formatter is None:
+        formatter = format_content
 
     if cntrl.aaaLogin() != 200:
         return (1, "Unable to login to controller")
 
     rc = cntrl.genericGET()
     if rc == 200:
-        return (0, format_content(cntrl.get_content()))
+        return (0, formatter(cntrl.get_content()))
     else:
         return (1, "%s: %s" % (rc, httplib.responses[rc]))
 
@@ -196,23 +314,141 @@ def format_content(content):
     }
 
     """
-    element = {}                                           # dictionary to hold the class
-    result = { 'ansible_facts': {} }                       # the result is a dictionary with one element called 'ansible_facts'
-    content = json.loads(content)["imdata"]                # remove the IMDATA wrapper
-    for item in content:                                   # content is a *list* of one or more elements returned for the class query
-        d_item = dict(item)
-        aci_class = d_item.keys()[0]                       # get the name of the class we queried
-        try:
-            element[aci_class]
-        except KeyError:
-            element[aci_class] = []                        # each returned MO is a list element
+    return ACIFormat.format_imdata(json.loads(content)["imdata"])  # remove the IMDATA wrapper
+
+
+# ---------------------------------------------------------------------------
+# FORMAT_COLUMNAR
+# ---------------------------------------------------------------------------
+DICTIONARY_LIMIT = 256                                     # most distinct values of a dictionary encoded attribute
 
-        attributes = d_item[aci_class]["attributes"]
-        element[aci_class].append(attributes)              # append the MO to our class dictionary
+def format_columnar(result):
+    """ rewrites the list of attribute dictionaries of each class in a result of format_content
+        into a table, so each attribute name appears once rather than once per MO
 
-    result["ansible_facts"] = element
+      "fvCEp": { "columns": [ "dn", "encap", ... ],
+                 "rows": [ [ "uni/tn-...", 0, ... ], ... ],
+                 "dictionaries": { "encap": [ "vlan-100", ... ] } }
+
+    An attribute is dictionary encoded when it has at most DICTIONARY_LIMIT distinct values
+    and they repeat, on average, at least twice. Its values in rows are then indexes into
+    its dictionary. Attributes missing from an MO are null.
+    """
+    for aci_class, mos in result["ansible_facts"].items():
+        columns = []
+        distinct = {}
+        for attributes in mos:
+            for name, value in attributes.items():
+                if name not in distinct:
+                    columns.append(name)
+                    distinct[name] = set()
+                if len(distinct[name]) <= DICTIONARY_LIMIT:
+                    distinct[name].add(value)
+
+        dictionaries = {}
+        codes = {}
+        for name in columns:
+            values = distinct[name]
+            if len(values) <= DICTIONARY_LIMIT and len(values) * 2 <= len(mos):
+                dictionaries[name] = sorted(values)
+                codes[name] = dict((value, code) for code, value in enumerate(dictionaries[name]))
+
+        rows = []
+        for attributes in mos:
+            row = []
+            for name in columns:
+                value = attributes.get(name)
+                if name in codes and value is not None:
+                    value = codes[name][value]
+                row.append(value)
+            rows.append(row)
+
+        result["ansible_facts"][aci_class] = dict(columns=columns, rows=rows, dictionaries=dictionaries)
     return result
-        
+
+
+# ---------------------------------------------------------------------------
+# FORMAT_COUNT
+# ---------------------------------------------------------------------------
+def count_fact(name, mode, count):
+    """ the fact returned by the count_only (mode 'count') and exists (mode 'exists') queries """
+    if mode == "exists":
+        return { 'ansible_facts': { "%s_exists" % name: count > 0 } }
+    return { 'ansible_facts': { "%s_count" % name: count } }
+
+
+def format_count(content, name, mode):
+    """ formats the content of a count or existence query into a fact
+
+    rsp-subtree-include=count returns a single moCount element:
+
+      "imdata" [ moCount: attributes: count: "42" ]
+
+    and an existence query (page-size=1) returns at most one MO
+    """
+    imdata = json.loads(content)["imdata"]
+    if mode == "exists":
+        return count_fact(name, mode, len(imdata))
+
+    count = 0
+    for item in imdata:
+        try:
+            count += int(item["moCount"]["attributes"]["count"])
+        except (KeyError, ValueError):
+            pass
+    return count_fact(name, mode, count)
+
+
+# ---------------------------------------------------------------------------
+# LOCAL CACHE
+# ---------------------------------------------------------------------------
+def cache_file(cache_dir, host, username, aci_class):
+    """ the file holding the local copy of a class from the given controller. The copy is kept
+        per user, an APIC user's RBAC scope limits which MOs a class query returns
+    """
+    return os.path.join(cache_dir, "%s_%s_%s.json" % (host, username, aci_class))
+
+
+def read_cache(cache_dir, host, username, aci_class, ttl):
+    " return the saved content of an unfiltered class query, or None if missing or older than ttl seconds "
+    filename = cache_file(cache_dir, host, username, aci_class)
+    try:
+        if time.time() - os.path.getmtime(filename) > ttl:
+            return None
+        with open(filename, "r") as cachefo:
+            return cachefo.read()
+    except (IOError, OSError):
+        return None
+
+
+def write_cache(cache_dir, host, username, aci_class, content):
+    " save the content of an unfiltered class query "
+    try:
+        AnsibleACI.write_atomic(cache_file(cache_dir, host, username, aci_class), content)
+    except (IOError, OSError) as e:
+        logger.warning("DEVICE=%s unable to write cache for %s: %s" % (host, aci_class, e))
+
+
+def local_query(content, aci_class, queryfilter):
+    """ evaluate the filter against a saved answer set and return the matching imdata
+        elements, or None when the filter can not be answered locally (parse error or it
+        references other classes). Without a filter all elements match.
+    """
+    imdata = json.loads(content)["imdata"]
+    if not queryfilter:
+        return imdata
+
+    try:
+        node = ACIFilter.parse(queryfilter)
+    except ACIFilter.FilterError as e:
+        logger.info("local filter not used: %s" % e)
+        return None
+    if node.classes() - set([aci_class]):
+        return None
+
+    index = ACIFilter.MOIndex([dict(item).values()[0]["attributes"] for item in imdata])
+    return [imdata[position] for position in sorted(node.select(index))]
+
 
 # ---------------------------------------------------------------------------
 # MAIN
@@ -227,8 +463,16 @@ def main():
             host = dict(required=True),
             username = dict(required=True),
             password  = dict(required=True),
+            subtree = dict(required=False, choices=['full', 'children']),
+            subtree_class = dict(required=False),
+            count_only = dict(required=False, default=False, type='bool'),
+            exists = dict(required=False, default=False, type='bool'),
+            format = dict(required=False, default='list', choices=['list', 'columnar']),
+            cache_dir = dict(required=False),
+            cache_ttl = dict(required=False, default=300, type='int'),
             debug = dict(required=False)
          ),
+        mutually_exclusive=[['count_only', 'exists']],
         check_invalid_arguments=False,
         add_file_common_args=True
     )
@@ -237,15 +481,56 @@ def main():
     cntrl.setcontrollerIP(module.params["host"])
     cntrl.setUsername(module.params["username"])                               
     cntrl.setPassword(module.params["password"])
-    try:
-        queryfilter = "?query-target-filter=" + module.params["queryfilter"]
-    except TypeError:
-        queryfilter = ""
-
-    cntrl.setgeneric_URL("%s://%s" + module.params["URI"] + queryfilter)
+    queryfilter = module.params["queryfilter"]
+
+    options = []
+    if queryfilter:
+        options.append("query-target-filter=" + queryfilter)
+    if module.params["subtree"]:
+        options.append("rsp-subtree=" + module.params["subtree"])
+        if module.params["subtree_class"]:
+            options.append("rsp-subtree-class=" + module.params["subtree_class"])
+
+    mode = None
+    if module.params["count_only"]:
+        mode = "count"
+        options.append("rsp-subtree-include=count")
+    elif module.params["exists"]:
+        mode = "exists"
+        options.append("page-size=1")
+    query = ""
+    if options:
+        query = "?" + "&".join(options)
+
+    cntrl.setgeneric_URL("%s://%s" + module.params["URI"] + query)
     logger.info("DEVICE=%s URL=%s" %  (module.params["host"], cntrl.generic_URL))
-                                  
-    code, response = process(cntrl)
+
+    cache_dir = module.params["cache_dir"]
+    aci_class = ACIFormat.uri_class(module.params["URI"])
+    if module.params["subtree"]:
+        aci_class = None                                   # the cache only holds plain class queries
+    if cache_dir and aci_class and (queryfilter or mode):
+        content = read_cache(cache_dir, module.params["host"], module.params["username"], aci_class, module.params["cache_ttl"])
+        if content:
+            imdata = local_query(content, aci_class, queryfilter)
+            if imdata is not None:
+                logger.info('DEVICE=%s STATUS=0 SOURCE=%s' % (module.params["host"], cache_file(cache_dir, module.params["host"], module.params["username"], aci_class)))
+                if mode:
+                    module.exit_json(**count_fact(aci_class, mode, len(imdata)))
+                if module.params["format"] == "columnar":
+                    module.exit_json(**format_columnar(ACIFormat.format_imdata(imdata)))
+                module.exit_json(**ACIFormat.format_imdata(imdata))
+
+    formatter = None
+    if mode:
+        name = ACIFormat.uri_class(module.params["URI"]) or "mo"
+        formatter = lambda content: format_count(content, name, mode)
+    elif module.params["format"] == "columnar":
+        formatter = lambda content: format_columnar(format_content(content))
+
+    code, response = process(cntrl, formatter)
+    if code == 0 and cache_dir and aci_class and not (queryfilter or mode):
+        write_cache(cache_dir, module.params["host"], module.params["username"], aci_class, cntrl.get_content())
     cntrl.aaaLogout()
 
     if code == 1:
@@ -259,6 +544,7 @@ def main():
 
 
 from ansible.module_utils.basic import *
-main()
+if __name__ == '__main__':
+    main()
 
 
@@ -17,6 +17,7 @@
      25 Aug   2015  |  2.6 - added response requested flag 
      26 Aug   2015  |  2.7 - added idempotency logic for changed flag
       3 Sept  2015  |  2.8 - included status="deleted" as an option to trigger the change flag
+     19 Oct   2026  |  2.9 - stream the XML file rather than reading it into memory, optional gzip, capped response
    
 """
 
@@ -24,7 +25,7 @@ DOCUMENTATION = '''
 ---
 module: aci_install_config
 author: Joel W. King, World Wide Technology
-version_added: "2.8"
+version_added: "2.9"
 short_description: Loads a configuration file to the northbound interface of a Cisco ACI controller (APIC)
 description:
     - This module reads an XML configuration file and posts to the URI specified to the APIC northbound interface
@@ -70,6 +71,18 @@ options:
             - Flag to indicate if output should return a response from the REST call.
         required: false
 
+    compress:
+        description:
+            - Gzip the XML while it is sent (Content-Encoding gzip, chunked transfer).
+        required: false
+        default: false
+
+    max_response:
+        description:
+            - Most bytes of the controller response kept to determine the changed flag and for debug output.
+        required: false
+        default: 16777216
+
 '''
 
 EXAMPLES = '''
@@ -126,13 +139,14 @@ logger.setLevel(logging.INFO)
 # ---------------------------------------------------------------------------
 
 def readxml(file_name):
-    """" read xml files for processing """
+    """ open xml files for processing, the file object is streamed to the controller
+        by genericPOST, so the file is never read into memory as a whole
+    """
     try:
-        xmlfo = open(file_name, "r")
-        data = xmlfo.read()
-    except:
+        xmlfo = open(file_name, "rb")
+    except (IOError, OSError):
         return None
-    return data
+    return xmlfo
 
 # ---------------------------------------------------------------------------
 # PROCESS
@@ -165,6 +179,8 @@ def process(cntrl, xml):
         for item in changed_msg:
             if item in cntrl.content:
                 changed = True
+        if cntrl.truncated:
+            response_requested += " (response truncated at %s bytes)" % cntrl.max_content
         return (0, changed, "%s: %s %s" % (rc, httplib.responses[rc], response_requested))
     else:
         return (1, False, "%s: %s %s" % (rc, httplib.responses[rc], cntrl.content))
@@ -185,7 +201,9 @@ def main():
             host = dict(required=True),
             username = dict(required=True),
             password  = dict(required=True),
-            debug = dict(required=False, default=False, type='bool')
+            debug = dict(required=False, default=False, type='bool'),
+            compress = dict(required=False, default=False, type='bool'),
+            max_response = dict(required=False, default=16777216, type='int')
          ),
         check_invalid_arguments=False,
         add_file_common_args=True
@@ -197,6 +215,8 @@ def main():
     cntrl.setUsername(module.params["username"])                               
     cntrl.setPassword(module.params["password"])
     cntrl.setDebug(module.params["debug"])
+    cntrl.setCompress(module.params["compress"])
+    cntrl.setmax_content(module.params["max_response"])
 
     cntrl.setgeneric_URL("%s://%s" + module.params["URI"] + "?rsp-subtree=modified")
     xml = readxml(module.params["xml_file"]) 
@@ -204,6 +224,8 @@ def main():
     #  Process request                     
     code, changed, response = process(cntrl, xml)
     cntrl.aaaLogout()
+    if xml is not None:
+        xml.close()
 
     if code == 1:
         logger.error('DEVICE=%s STATUS=%s MSG=%s' % (module.params["host"], code, response))
@@ -0,0 +1,282 @@
+#!/usr/bin/env python
+
+"""
+     Replay APIC traffic recorded by AnsibleACI for offline load testing
+
+     Record a trace by running playbooks (or aci_collect_facts) with the environment variable
+     ANSIBLE_ACI_RECORD set to a file name, or call Connection.setRecord(). Every request and
+     response is appended as a JSON line with its timing and sizes; passwords and session
+     tokens are replaced by ******.
+
+     serve   runs a fake APIC on a local port which answers each request with the response
+             recorded for the same method and path, optionally with the recorded latency.
+
+     replay  plays the client side of the trace against a controller (the fake APIC, or a
+             lab APIC with --username/--password), as N concurrent clients and with the
+             recorded pacing sped up S times, then reports throughput and latency.
+
+     Revision history:
+     19 October 2026  |  1.0 - initial release
+
+     Usage:
+
+       ANSIBLE_ACI_RECORD=/tmp/aci.trace ansible-playbook aci_gather_facts.yml
+
+       ./aci_replay.py serve /tmp/aci.trace --port 8080 --latency &
+       ./aci_replay.py replay /tmp/aci.trace --target http://127.0.0.1:8080 --concurrency 20 --speedup 10
+
+"""
+
+import re
+import sys
+import time
+import json
+import urllib
+import argparse
+import threading
+import BaseHTTPServer
+import SocketServer
+from multiprocessing.pool import ThreadPool
+
+import requests
+
+
+# ---------------------------------------------------------------------------
+# TRACE
+# ---------------------------------------------------------------------------
+
+def read_trace(filename, controller=None):
+    " read the recorded exchanges in the order they were issued, optionally of a single controller "
+    traces = []
+    with open(filename, "r") as tracefo:
+        for line in tracefo:
+            line = line.strip()
+            if line:
+                trace = json.loads(line)
+                if controller is None or trace["controller"] == controller:
+                    traces.append(trace)
+    traces.sort(key=lambda trace: trace["time"])
+    return traces
+
+
+# ---------------------------------------------------------------------------
+# SERVE
+# ---------------------------------------------------------------------------
+
+class TraceServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """
+      Fake APIC answering from a trace. Requests with the same method and path are answered
+      with the recorded responses in turn, starting over when all have been used. Paths are
+      compared URL decoded, the trace holds the URL as given to requests, before encoding.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, traces, latency=False, speedup=1.0, verbose=False):
+        BaseHTTPServer.HTTPServer.__init__(self, address, TraceHandler)
+        self.latency = latency
+        self.speedup = speedup or 1.0
+        self.verbose = verbose
+        self.lock = threading.Lock()
+        self.responses = {}
+        self.counters = {}
+        for trace in traces:
+            path = urllib.unquote(trace["path"])
+            self.responses.setdefault((trace["method"], path), []).append(trace)
+            if "?" in path:
+                self.responses.setdefault((trace["method"], path.split("?")[0]), []).append(trace)
+
+    def next_response(self, method, path):
+        " the next recorded exchange for the request, matching the query string if possible "
+        path = urllib.unquote(path)
+        for key in ((method, path), (method, path.split("?")[0])):
+            if key in self.responses:
+                with self.lock:
+                    count = self.counters.get(key, 0)
+                    self.counters[key] = count + 1
+                return self.responses[key][count % len(self.responses[key])]
+        return None
+
+
+class TraceHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """ answers GET and POST requests of the Connection class from the trace """
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.reply("GET")
+
+    def do_POST(self):
+        self.reply("POST")
+
+    def read_body(self):
+        " read and discard the request body, plain or chunked "
+        if self.headers.getheader("transfer-encoding", "").lower() == "chunked":
+            while True:
+                size = int(self.rfile.readline().split(";")[0].strip() or "0", 16)
+                if size == 0:
+                    self.rfile.readline()
+                    return
+                self.rfile.read(size + 2)
+        length = int(self.headers.getheader("content-length") or 0)
+        if length:
+            self.rfile.read(length)
+
+    def reply(self, method):
+        self.read_body()
+        trace = self.server.next_response(method, self.path)
+        if trace is None:
+            status = 400
+            content = '<?xml version="1.0" encoding="UTF-8"?><imdata totalCount="1"><error code="400" ' \
+                      'text="no recorded response for %s %s"/></imdata>' % (method, self.path)
+        else:
+            status = trace["status"]
+            content = trace["response"].encode("utf-8")
+            if self.server.latency:
+                time.sleep(trace["elapsed"] / self.server.speedup)
+
+        self.send_response(status)
+        if self.path.split("?")[0].endswith(".json"):
+            self.send_header("Content-Type", "application/json")
+        else:
+            self.send_header("Content-Type", "application/xml")
+        if "/api/aaaLogin" in self.path or "/api/aaaRefresh" in self.path:
+            self.send_header("Set-Cookie", "APIC-cookie=replay; path=/")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            BaseHTTPServer.BaseHTTPRequestHandler.log_message(self, format, *args)
+
+
+def serve(options):
+    traces = read_trace(options.trace, options.controller)
+    server = TraceServer((options.address, options.port), traces, options.latency, options.speedup, options.verbose)
+    sys.stdout.write("serving %s recorded exchanges on %s:%s\n" % (len(traces), options.address, options.port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+# ---------------------------------------------------------------------------
+# REPLAY
+# ---------------------------------------------------------------------------
+
+def replay_client(args):
+    """ replay the trace once, in order, pacing the requests at the recorded offsets divided
+        by speedup (0 sends as fast as possible). Returns a result for each request
+    """
+    traces, options = args
+    session = requests.Session()
+    session.verify = False
+    results = []
+    if not traces:
+        return results
+
+    base = traces[0]["time"]
+    started = time.time()
+    for trace in traces:
+        if options.speedup:
+            wait = (trace["time"] - base) / options.speedup - (time.time() - started)
+            if wait > 0:
+                time.sleep(wait)
+
+        body = trace["request"] or None
+        if body and options.username and "/api/aaaLogin" in trace["path"]:
+            body = re.sub(r'name="[^"]*"', 'name="%s"' % options.username, body)
+            body = re.sub(r'pwd="[^"]*"', 'pwd="%s"' % options.password, body)
+
+        result = dict(path=trace["path"].split("?")[0], expected=trace["status"])
+        start = time.time()
+        try:
+            r = session.request(trace["method"], options.target + trace["path"], data=body,
+                                headers={'content-type': "application/xml"})
+            result["status"] = r.status_code
+            result["bytes"] = len(r.content)
+        except requests.RequestException as e:
+            result["status"] = None
+            result["error"] = str(e)
+        result["elapsed"] = time.time() - start
+        results.append(result)
+    session.close()
+    return results
+
+
+def percentile(values, fraction):
+    " the value at the fraction (0..1) of the sorted values "
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def replay(options):
+    traces = read_trace(options.trace, options.controller)
+    requests.packages.urllib3.disable_warnings()
+
+    pool = ThreadPool(options.concurrency)
+    start = time.time()
+    try:
+        clients = pool.map(replay_client, [(traces, options)] * options.concurrency)
+    finally:
+        pool.close()
+        pool.join()
+    wall = time.time() - start
+
+    results = [result for client in clients for result in client]
+    latencies = sorted([result["elapsed"] for result in results])
+    errors = [result for result in results if result["status"] is None]
+    mismatches = [result for result in results if result["status"] is not None and result["status"] != result["expected"]]
+
+    sys.stdout.write("requests    %s in %.3fs, %.1f/s\n" % (len(results), wall, len(results) / wall if wall else 0))
+    sys.stdout.write("received    %s bytes\n" % sum([result.get("bytes", 0) for result in results]))
+    sys.stdout.write("latency     p50 %.4fs  p95 %.4fs  p99 %.4fs  max %.4fs\n" % (
+        percentile(latencies, 0.50), percentile(latencies, 0.95), percentile(latencies, 0.99), percentile(latencies, 1.0)))
+    sys.stdout.write("errors      %s, status differing from the trace %s\n" % (len(errors), len(mismatches)))
+
+    by_path = {}
+    for result in results:
+        by_path.setdefault(result["path"], []).append(result["elapsed"])
+    slowest = sorted(by_path.items(), key=lambda item: -sum(item[1]) / len(item[1]))[:10]
+    for path, elapsed in slowest:
+        sys.stdout.write("  %8.4fs avg  %6s x  %s\n" % (sum(elapsed) / len(elapsed), len(elapsed), path))
+    return 1 if errors else 0
+
+
+# ---------------------------------------------------------------------------
+# MAIN
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve or replay APIC traffic recorded by AnsibleACI")
+    subparsers = parser.add_subparsers()
+
+    serve_parser = subparsers.add_parser("serve", help="run a fake APIC answering from the trace")
+    serve_parser.add_argument("trace", help="trace file recorded with ANSIBLE_ACI_RECORD")
+    serve_parser.add_argument("--address", default="127.0.0.1", help="address to listen on (default: 127.0.0.1)")
+    serve_parser.add_argument("--port", type=int, default=8080, help="port to listen on (default: 8080)")
+    serve_parser.add_argument("--latency", action="store_true", help="delay each response by its recorded time")
+    serve_parser.add_argument("--speedup", type=float, default=1.0, help="divide the recorded latency by this factor")
+    serve_parser.add_argument("--controller", help="only serve the exchanges recorded from this controller")
+    serve_parser.add_argument("--verbose", action="store_true", help="log each request")
+    serve_parser.set_defaults(func=serve)
+
+    replay_parser = subparsers.add_parser("replay", help="replay the client side of the trace")
+    replay_parser.add_argument("trace", help="trace file recorded with ANSIBLE_ACI_RECORD")
+    replay_parser.add_argument("--target", default="http://127.0.0.1:8080", help="base URL of the controller")
+    replay_parser.add_argument("--concurrency", type=int, default=1, help="number of clients replaying the trace at once")
+    replay_parser.add_argument("--speedup", type=float, default=1.0,
+                               help="divide the recorded request spacing by this factor, 0 sends as fast as possible")
+    replay_parser.add_argument("--controller", help="only replay the exchanges recorded from this controller")
+    replay_parser.add_argument("--username", help="login name used when replaying against a real APIC")
+    replay_parser.add_argument("--password", help="password used when replaying against a real APIC")
+    replay_parser.set_defaults(func=replay)
+
+    options = parser.parse_args()
+    return options.func(options)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,280 @@
+#!/usr/bin/env python
+
+"""
+     Revision history:
+     19 October 2026  |  1.0 - initial release
+
+"""
+
+DOCUMENTATION = '''
+---
+module: aci_resolve_endpoints
+version_added: "1.0"
+short_description: Resolves many IP and MAC addresses to fabric endpoints (fvCEp) in a few class queries
+description:
+    - find-macaddress.yml resolves one IP address per run of aci_gather_facts. This module takes lists of IP
+      and MAC addresses and packs them into or(eq(fvCEp.ip,...),eq(fvCEp.mac,...),...) filters, each kept under
+      max_url characters once URL encoded. The queries are sent concurrently using a single login session.
+
+      The facts returned map each address to the endpoints found, an address learned in more than one EPG or VRF
+      has one entry per endpoint. Addresses with no endpoint are listed in missing_ips and missing_macs.
+
+      The module writes a log file to the /tmp directory and imbeds the julian date in the file name.
+
+requirements:
+    - The module uses the AnsibleACI python module, which must be specified in the PYTHONPATH or in the local directory
+
+options:
+    host:
+        description:
+            - The IP address or hostname of the ACI controller (APIC)
+        required: true
+    username:
+        description:
+            - Login username
+        required: true
+    password:
+        description:
+            - Login password
+        required: true
+    ips:
+        description:
+            - List of IP addresses to resolve
+        required: false
+    macs:
+        description:
+            - List of MAC addresses to resolve, in any of the forms 0050.569a.0102, 00-50-56-9A-01-02 or 00:50:56:9a:01:02
+        required: false
+    max_url:
+        description:
+            - Longest URL encoded filter sent in one query
+        required: false
+        default: 4000
+    forks:
+        description:
+            - Maximum number of queries issued at the same time
+        required: false
+        default: 4
+    debug:
+        description:
+            - A switch to enable debug.
+        required: false
+
+'''
+
+EXAMPLES = '''
+
+  - name: Resolve a list of IP addresses
+    aci_resolve_endpoints:
+     host: "{{hostname}}"
+     username: admin
+     password: "{{password}}"
+     ips: "{{ IPaddrs }}"
+
+  - debug: msg="{{ item.key }} mac {{ item.value[0].mac }} encap {{ item.value[0].encap }}"
+    with_dict: "{{ ip_endpoints }}"
+
+  - debug: var=missing_ips
+
+   Facts returned:
+
+     "ip_endpoints": {"192.0.2.5": [{"dn": "uni/tn-xStart/ap-web/epg-web/cep-00:50:56:9A:01:02",
+                                     "encap": "vlan-100", "ip": "192.0.2.5", "mac": "00:50:56:9A:01:02"}]},
+     "mac_endpoints": {},
+     "missing_ips": ["192.0.2.6"],
+     "missing_macs": []
+
+'''
+
+import re
+import sys
+import time
+import json
+import urllib
+import logging
+import httplib
+import getpass
+from multiprocessing.pool import ThreadPool
+
+try:
+    import AnsibleACI
+except ImportError:
+    sys.path.append("/usr/share/ansible")
+    import AnsibleACI
+
+# ---------------------------------------------------------------------------
+# LOGGING
+# ---------------------------------------------------------------------------
+
+logfilename = "aci_resolve_endpoints"
+logger = logging.getLogger(logfilename)
+hdlrObj = logging.FileHandler("/tmp/%s_%s_%s.log" % (logfilename, getpass.getuser(), time.strftime("%j")))
+formatter = logging.Formatter('%(asctime)s %(levelname)s %(message)s')
+hdlrObj.setFormatter(formatter)
+logger.addHandler(hdlrObj)
+logger.setLevel(logging.INFO)
+
+ENDPOINT_ATTRIBUTES = ["ip", "mac", "encap", "dn"]
+
+
+# ---------------------------------------------------------------------------
+# FILTERS
+# ---------------------------------------------------------------------------
+
+def normalize_mac(mac):
+    " the MAC address as the APIC stores it, 00:50:56:9A:01:02 "
+    digits = re.sub(r'[^0-9A-Fa-f]', "", mac).upper()
+    if len(digits) != 12:
+        return mac.strip().upper()
+    return ":".join([digits[i:i + 2] for i in range(0, 12, 2)])
+
+
+def encoded_length(text):
+    " length of the text once URL encoded "
+    return len(urllib.quote(text, safe="(),.:/-_"))
+
+
+def build_filter(terms):
+    " a single eq() term, or the terms combined with or() "
+    if len(terms) == 1:
+        return terms[0]
+    return "or(%s)" % ",".join(terms)
+
+
+def chunk_filters(terms, max_url):
+    """ pack the eq() terms into as few filters as possible, each at most max_url characters
+        once URL encoded
+    """
+    filters = []
+    current = []
+    length = encoded_length("or()")
+    for term in terms:
+        term_length = encoded_length(term) + 1             # and the comma separating it
+        if current and length + term_length > max_url:
+            filters.append(build_filter(current))
+            current = []
+            length = encoded_length("or()")
+        current.append(term)
+        length += term_length
+    if current:
+        filters.append(build_filter(current))
+    return filters
+
+
+# ---------------------------------------------------------------------------
+# QUERY
+# ---------------------------------------------------------------------------
+
+def query_chunk(args):
+    """ issue one class query on a clone of the logged in connection, returns the
+        status code and the endpoints found
+    """
+    cntrl, queryfilter = args
+    cntrl = cntrl.clone()
+    cntrl.setgeneric_URL("%s://%s/api/class/fvCEp.json?query-target-filter=" + queryfilter)
+    rc = cntrl.genericGET()
+    if rc != 200:
+        return rc, []
+
+    endpoints = []
+    for item in json.loads(cntrl.get_content())["imdata"]:
+        attributes = item["fvCEp"]["attributes"]
+        endpoints.append(dict((name, attributes.get(name)) for name in ENDPOINT_ATTRIBUTES))
+    return rc, endpoints
+
+
+def resolve(cntrl, ips, macs, max_url, forks):
+    """ resolve the addresses, returns (errors, facts) where errors lists the status code of
+        each failed query
+    """
+    terms = ['eq(fvCEp.ip,"%s")' % ip for ip in ips] + ['eq(fvCEp.mac,"%s")' % mac for mac in macs]
+    filters = chunk_filters(terms, max_url)
+    logger.info("DEVICE=%s ADDRESSES=%s QUERIES=%s" % (cntrl.controllername, len(terms), len(filters)))
+
+    pool = ThreadPool(max(1, min(forks, len(filters))))
+    try:
+        results = pool.map(query_chunk, [(cntrl, queryfilter) for queryfilter in filters])
+    finally:
+        pool.close()
+        pool.join()
+
+    errors = []
+    ip_endpoints = {}
+    mac_endpoints = {}
+    wanted_ips = set(ips)
+    wanted_macs = set(macs)
+    seen = set()
+    for rc, endpoints in results:
+        if rc != 200:
+            errors.append("%s: %s" % (rc, httplib.responses.get(rc, "connection failure")))
+        for endpoint in endpoints:
+            if endpoint["dn"] in seen:                     # matched by both its IP and MAC, in two queries
+                continue
+            seen.add(endpoint["dn"])
+            if endpoint["ip"] in wanted_ips:
+                ip_endpoints.setdefault(endpoint["ip"], []).append(endpoint)
+            if endpoint["mac"] in wanted_macs:
+                mac_endpoints.setdefault(endpoint["mac"], []).append(endpoint)
+
+    facts = dict(ip_endpoints=ip_endpoints,
+                 mac_endpoints=mac_endpoints,
+                 missing_ips=[ip for ip in ips if ip not in ip_endpoints],
+                 missing_macs=[mac for mac in macs if mac not in mac_endpoints])
+    return errors, facts
+
+
+# ---------------------------------------------------------------------------
+# MAIN
+# ---------------------------------------------------------------------------
+
+def main():
+
+    module = AnsibleModule(
+        argument_spec = dict(
+            host = dict(required=True),
+            username = dict(required=True),
+            password  = dict(required=True),
+            ips = dict(required=False, default=[], type='list'),
+            macs = dict(required=False, default=[], type='list'),
+            max_url = dict(required=False, default=4000, type='int'),
+            forks = dict(required=False, default=4, type='int'),
+            debug = dict(required=False, default=False, type='bool')
+         ),
+        check_invalid_arguments=False,
+        add_file_common_args=True
+    )
+
+    ips = []
+    for ip in module.params["ips"]:
+        if ip.strip() not in ips:
+            ips.append(ip.strip())
+    macs = []
+    for mac in module.params["macs"]:
+        if normalize_mac(mac) not in macs:
+            macs.append(normalize_mac(mac))
+    if not ips and not macs:
+        module.exit_json(changed=False, ansible_facts=dict(ip_endpoints={}, mac_endpoints={}, missing_ips=[], missing_macs=[]))
+
+    cntrl = AnsibleACI.Connection()
+    cntrl.setcontrollerIP(module.params["host"])
+    cntrl.setUsername(module.params["username"])
+    cntrl.setPassword(module.params["password"])
+    cntrl.setDebug(module.params["debug"])
+
+    if cntrl.aaaLogin() != 200:
+        logger.error('DEVICE=%s STATUS=1 MSG=Unable to login to controller' % module.params["host"])
+        module.fail_json(msg="Unable to login to controller")
+
+    errors, facts = resolve(cntrl, ips, macs, module.params["max_url"], module.params["forks"])
+    cntrl.aaaLogout()
+
+    if errors:
+        logger.error('DEVICE=%s STATUS=1 MSG=%s' % (module.params["host"], "; ".join(errors)))
+        module.fail_json(msg="; ".join(errors), ansible_facts=facts)
+    logger.info('DEVICE=%s STATUS=0 MISSING=%s' % (module.params["host"], len(facts["missing_ips"]) + len(facts["missing_macs"])))
+    module.exit_json(changed=False, ansible_facts=facts)
+
+
+from ansible.module_utils.basic import *
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#
+#  aci_columnar.py
+#
+"""
+   Ansible filters to read the columnar facts of aci_gather_facts (format=columnar)
+
+     {{ fvCEp | aci_rows }}                         every row as an attribute dictionary
+     {{ fvCEp | aci_row(0) }}                       the row at an index
+     {{ fvCEp | aci_lookup('ip', '192.0.2.5') }}    the first row where ip is 192.0.2.5, or None
+     {{ fvCEp | aci_select('encap', 'vlan-100') }}  all rows where encap is vlan-100
+
+   Place the filter_plugins directory next to the playbook.
+
+# Version     Date           Comments
+# ----------- ------------   -------------------------------------------------
+# 1.0        19 Oct   2026   initial release
+"""
+
+
+def decode(table, row):
+    " return a row of the table as an attribute dictionary, resolving dictionary encoded values "
+    dictionaries = table.get("dictionaries", {})
+    attributes = {}
+    for name, value in zip(table["columns"], row):
+        if name in dictionaries and value is not None:
+            value = dictionaries[name][value]
+        attributes[name] = value
+    return attributes
+
+
+def encoded(table, attribute, value):
+    " the column position of the attribute and the value as stored in the rows "
+    position = table["columns"].index(attribute)
+    dictionary = table.get("dictionaries", {}).get(attribute)
+    if dictionary is not None:
+        try:
+            value = dictionary.index(value)
+        except ValueError:
+            value = None
+    return position, value
+
+
+def aci_rows(table):
+    " all rows of the table as attribute dictionaries "
+    return [decode(table, row) for row in table["rows"]]
+
+
+def aci_row(table, index):
+    " the row at the index as an attribute dictionary "
+    return decode(table, table["rows"][int(index)])
+
+
+def aci_select(table, attribute, value):
+    " the rows where the attribute equals the value "
+    if attribute not in table["columns"]:
+        return []
+    position, value = encoded(table, attribute, value)
+    if value is None:
+        return []
+    return [decode(table, row) for row in table["rows"] if row[position] == value]
+
+
+def aci_lookup(table, attribute, value):
+    " the first row where the attribute equals the value, None if there is none "
+    if attribute not in table["columns"]:
+        return None
+    position, value = encoded(table, attribute, value)
+    if value is None:
+        return None
+    for row in table["rows"]:
+        if row[position] == value:
+            return decode(table, row)
+    return None
+
+
+class FilterModule(object):
+    """ filters for the columnar facts of aci_gather_facts """
+    def filters(self):
+        return {
+            'aci_rows': aci_rows,
+            'aci_row': aci_row,
+            'aci_select': aci_select,
+            'aci_lookup': aci_lookup,
+        }
@@ -0,0 +1,317 @@
+#!/usr/bin/env python
+
+"""
+     Revision history:
+     19 October 2026  |  1.0 - initial release
+
+"""
+
+DOCUMENTATION = '''
+---
+module: netconf_batch_config
+version_added: "1.0"
+short_description: Renders the netconf_* role templates in memory and applies them over one NETCONF session per device
+description:
+    - The netconf_ospf and netconf_l3_interfaces roles render a file per template (and per interface) under ./configs/
+      and push each with netconf_config, which opens a new SSH/NETCONF session for every task.
+
+      This module renders the templates in memory and merges them into one configuration. Each device then gets one
+      NETCONF session: the configuration is sent with a single edit-config to the candidate datastore, get-config
+      of running and candidate is compared, and the change is committed only when they differ, otherwise it is
+      discarded and the device reported unchanged. Devices without the candidate capability are edited in running
+      and compared before and after, in check mode such a device is reported as failed as it can not be
+      compared without changing it. Devices are configured in parallel.
+
+      The module writes a log file to the /tmp directory and imbeds the julian date in the file name.
+
+requirements:
+    - ncclient
+    - jinja2
+    - AnsibleFanout module
+
+options:
+    host:
+        description:
+            - The IP address or hostname of the device, or a list of them.
+        required: true
+    hostvars:
+        description:
+            - Per device variables, usually "{{ hostvars }}". A variable defined for a device here takes
+              precedence over the same variable in template_vars.
+              The argument is not logged, hostvars holds every inventory variable including secrets.
+        required: false
+    template_vars:
+        description:
+            - Variables used to render the templates.
+        required: false
+    templates:
+        description:
+            - List of templates to render. Each has src, the path of the Jinja2 template, and optionally loop,
+              the name of a list variable; the template is then rendered once per element with the element as item.
+        required: true
+    username:
+        description:
+            - Login username
+        required: true
+    password:
+        description:
+            - Login password
+        required: true
+    port:
+        description:
+            - NETCONF port
+        required: false
+        default: 830
+    hostkey_verify:
+        description:
+            - Verify the SSH host key of the device
+        required: false
+        default: false
+    timeout:
+        description:
+            - Seconds to wait for each NETCONF operation
+        required: false
+        default: 30
+    forks:
+        description:
+            - Maximum number of devices configured at the same time
+        required: false
+        default: 8
+
+'''
+
+EXAMPLES = '''
+
+  Replaces the generate and configure tasks of roles/netconf_ospf and roles/netconf_l3_interfaces:
+
+  - name: Configure OSPF and interfaces with NETCONF
+    netconf_batch_config:
+      host: "{{ inventory_hostname }}"
+      username: "{{ lookup('env','ANSIBLE_NET_USERNAME') }}"
+      password: "{{ lookup('env','ANSIBLE_NET_PASSWORD') }}"
+      template_vars:
+        ospf: "{{ ospf }}"
+        ospf_router_id: "{{ ospf_router_id }}"
+        ospf_networks: "{{ ospf_networks }}"
+        l3_interfaces: "{{ l3_interfaces }}"
+      templates:
+        - src: "roles/netconf_ospf/files/ned_ospf.j2"
+        - src: "roles/netconf_l3_interfaces/files/ietf_interface_template.j2"
+          loop: l3_interfaces
+
+  Or once for the whole inventory, the devices are then configured in parallel:
+
+  - name: Configure interfaces on all routers
+    netconf_batch_config:
+      host: "{{ ansible_play_hosts }}"
+      hostvars: "{{ hostvars }}"
+      username: "{{ lookup('env','ANSIBLE_NET_USERNAME') }}"
+      password: "{{ lookup('env','ANSIBLE_NET_PASSWORD') }}"
+      templates:
+        - src: "roles/netconf_l3_interfaces/files/ietf_interface_template.j2"
+          loop: l3_interfaces
+    run_once: true
+
+'''
+
+import os
+import sys
+import time
+import logging
+import getpass
+
+import jinja2
+
+try:
+    from ncclient import manager
+    from lxml import etree
+    HAS_NCCLIENT = True
+except ImportError:
+    HAS_NCCLIENT = False
+
+try:
+    import AnsibleFanout
+except ImportError:
+    sys.path.append("/usr/share/ansible")
+    import AnsibleFanout
+
+# ---------------------------------------------------------------------------
+# LOGGING
+# ---------------------------------------------------------------------------
+
+logfilename = 'netconf_batch_config'
+logger = logging.getLogger(logfilename)
+hdlrObj = logging.FileHandler("/tmp/%s_%s_%s.log" % (logfilename, getpass.getuser(), time.strftime("%j")))
+formatter = logging.Formatter('%(asctime)s %(levelname)s %(message)s')
+hdlrObj.setFormatter(formatter)
+logger.addHandler(hdlrObj)
+logger.setLevel(logging.INFO)
+
+CANDIDATE = "urn:ietf:params:netconf:capability:candidate"
+FILTER_DEPTH = 2                                           # levels of the config used to select what get-config returns
+
+
+# ---------------------------------------------------------------------------
+# RENDER
+# ---------------------------------------------------------------------------
+
+def render(templates, variables):
+    """ render each template in memory, a template with a loop is rendered once per element
+        of the list variable it names, with the element as item. Returns a list of XML strings
+    """
+    rendered = []
+    for template in templates:
+        src = template["src"]
+        env = jinja2.Environment(loader=jinja2.FileSystemLoader(os.path.dirname(os.path.abspath(src))),
+                                 undefined=jinja2.StrictUndefined)
+        jinja_template = env.get_template(os.path.basename(src))
+        if template.get("loop"):
+            for item in variables[template["loop"]] or []:
+                rendered.append(jinja_template.render(variables, item=item))
+        else:
+            rendered.append(jinja_template.render(variables))
+    return rendered
+
+
+def merge(rendered):
+    """ merge the rendered <config> documents into one. Top level containers with the same
+        tag, e.g. <interfaces> from each interface, are combined so each appears once
+    """
+    config = etree.Element("config")
+    for xml in rendered:
+        root = etree.fromstring(xml.strip())
+        for element in root:
+            existing = config.find(element.tag)
+            if existing is None:
+                config.append(element)
+            else:
+                existing.extend(list(element))
+    return config
+
+
+def subtree_filter(config):
+    """ a subtree filter selecting the parts of the datastore the config touches, the element
+        structure of the config down to FILTER_DEPTH levels without any leaf values
+    """
+    def copy(source, target, depth):
+        for element in source:
+            if not isinstance(element.tag, basestring) or target.find(element.tag) is not None:
+                continue
+            child = etree.SubElement(target, element.tag, nsmap=element.nsmap)
+            if depth > 1:
+                copy(element, child, depth - 1)
+
+    rep = etree.Element("filter", type="subtree")
+    copy(config, rep, FILTER_DEPTH)
+    return rep
+
+
+def canonical(xml):
+    " the datastore content without insignificant whitespace, for comparison "
+    parser = etree.XMLParser(remove_blank_text=True)
+    return etree.tostring(etree.fromstring(xml, parser), method="c14n")
+
+
+# ---------------------------------------------------------------------------
+# NETCONF
+# ---------------------------------------------------------------------------
+
+def configure_device(args):
+    """ apply the merged config to one device over a single NETCONF session,
+        run by the thread pool in configure_devices
+    """
+    host, variables, params, check_mode = args
+    start = time.time()
+    report = dict(changed=False, committed=False)
+
+    try:
+        config = merge(render(params["templates"], variables))
+        select = subtree_filter(config)
+        with manager.connect(host=host, port=params["port"], username=params["username"], password=params["password"],
+                             hostkey_verify=params["hostkey_verify"], look_for_keys=False, allow_agent=False,
+                             timeout=params["timeout"]) as session:
+            candidate = any(capability.startswith(CANDIDATE) for capability in session.server_capabilities)
+            report["target"] = "candidate" if candidate else "running"
+            before = session.get_config(source="running", filter=select).data_xml
+
+            if not candidate:
+                if check_mode:                             # can not be compared without changing running
+                    report["error"] = "check mode requires the candidate datastore, the device was not compared"
+                else:
+                    session.edit_config(target="running", config=config)
+                    after = session.get_config(source="running", filter=select).data_xml
+                    report["changed"] = canonical(before) != canonical(after)
+            else:
+                with session.locked("candidate"):
+                    session.discard_changes()                  # start from running, not someone else's edits
+                    session.edit_config(target="candidate", config=config)
+                    after = session.get_config(source="candidate", filter=select).data_xml
+                    report["changed"] = canonical(before) != canonical(after)
+                    if report["changed"] and not check_mode:
+                        session.commit()
+                        report["committed"] = True
+                    else:
+                        session.discard_changes()
+    except Exception as e:                                 # template, RPC, ssh and transport errors
+        report["error"] = "%s: %s" % (e.__class__.__name__, e)
+
+    report["elapsed"] = round(time.time() - start, 3)
+    return host, report
+
+
+def configure_devices(hosts, hostvars, params, check_mode):
+    """ configure each device, at most forks at a time. Returns a dictionary of
+        the report for each device, keyed by host
+    """
+    work = []
+    for host in hosts:
+        variables = dict(params["template_vars"])
+        variables.update(hostvars.get(host) or {})
+        variables.setdefault("inventory_hostname", host)
+        work.append((host, variables, params, check_mode))
+
+    return AnsibleFanout.fan_out(configure_device, work, params["forks"])
+
+
+# ---------------------------------------------------------------------------
+# MAIN
+# ---------------------------------------------------------------------------
+
+def main():
+
+    module = AnsibleModule(
+        argument_spec = dict(
+            host = dict(required=True, type='list'),
+            hostvars = dict(required=False, default={}, type='dict', no_log=True),
+            template_vars = dict(required=False, default={}, type='dict'),
+            templates = dict(required=True, type='list'),
+            username = dict(required=True),
+            password = dict(required=True, no_log=True),
+            port = dict(required=False, default=830, type='int'),
+            hostkey_verify = dict(required=False, default=False, type='bool'),
+            timeout = dict(required=False, default=30, type='int'),
+            forks = dict(required=False, default=8, type='int')
+         ),
+        supports_check_mode=True
+    )
+
+    if not HAS_NCCLIENT:
+        module.fail_json(msg="ncclient is required for this module")
+
+    for template in module.params["templates"]:
+        if not isinstance(template, dict) or "src" not in template:
+            module.fail_json(msg="each template requires src: %s" % template)
+
+    hosts = AnsibleFanout.unique(module.params["host"])
+    devices = configure_devices(hosts, module.params["hostvars"], module.params, module.check_mode)
+    changed, failed = AnsibleFanout.summarize(hosts, devices)
+    AnsibleFanout.log_reports(logger, hosts, devices, [("COMMITTED", lambda report: report["committed"])])
+
+    if failed:
+        module.fail_json(msg="failed to configure %s" % ", ".join(failed), changed=changed, devices=devices)
+    module.exit_json(changed=changed, devices=devices)
+
+
+from ansible.module_utils.basic import *
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,466 @@
+#!/usr/bin/env python
+
+"""
+     Revision history:
+     19 October 2026  |  1.0 - initial release
+
+"""
+
+DOCUMENTATION = '''
+---
+module: nxos_batch_config
+version_added: "1.0"
+short_description: Configures NX-OS switches from the nxos_* role variables with one batched NX-API request per device
+description:
+    - The nxos_vlans, nxos_l3_interfaces, nxos_hsrp, nxos_po_trunks, nxos_vpc_trunks and nxos_ospf roles
+      loop over their variables and issue one module run, and one NX-API request, per item.
+
+      This module takes the same variables as a whole. For each device it reads the running configuration once,
+      computes the CLI needed to reach the desired configuration and pushes it as a single NX-API JSON-RPC
+      request over one HTTP session. Lines already present in the running configuration are not sent,
+      a device needing no change is reported unchanged. Devices are configured in parallel.
+
+      The module writes a log file to the /tmp directory and imbeds the julian date in the file name.
+
+requirements:
+    - requests
+    - AnsibleFanout module
+
+options:
+    host:
+        description:
+            - The IP address or hostname of the switch, or a list of them.
+        required: true
+    hostvars:
+        description:
+            - Per device variables, usually "{{ hostvars }}". A variable defined for a device here takes
+              precedence over the same variable passed to the module.
+              The argument is not logged, hostvars holds every inventory variable including secrets.
+        required: false
+    username:
+        description:
+            - Login username
+        required: true
+    password:
+        description:
+            - Login password
+        required: true
+    transport:
+        description:
+            - Protocol used to reach NX-API
+        required: false
+        default: http
+        choices: ['http', 'https']
+    port:
+        description:
+            - NX-API port, defaults to 80 or 443 depending on transport
+        required: false
+    validate_certs:
+        description:
+            - Verify the certificate of the switch when transport is https
+        required: false
+        default: false
+    timeout:
+        description:
+            - Seconds to wait for each NX-API request
+        required: false
+        default: 15
+    forks:
+        description:
+            - Maximum number of devices configured at the same time
+        required: false
+        default: 8
+    vlans:
+        description:
+            - List of VLANs, each with id and name (nxos_vlans)
+        required: false
+    l3_interfaces:
+        description:
+            - List of layer 3 interfaces, each with interface_type, interface_id, description, ip_address
+              and prefix (nxos_l3_interfaces)
+        required: false
+    hsrp_interfaces:
+        description:
+            - List of HSRP groups, each with interface, group and vip (nxos_hsrp)
+        required: false
+    uplinks:
+        description:
+            - List of trunk port channels, each with port_channel_id and members (nxos_po_trunks)
+        required: false
+    trunks:
+        description:
+            - List of vPC trunk port channels, each with port_channel_id and members (nxos_vpc_trunks)
+        required: false
+    ospf:
+        description:
+            - OSPF process_id and networks, a list with interface and area (nxos_ospf)
+        required: false
+
+'''
+
+EXAMPLES = '''
+
+  Run per host, as the roles do:
+
+  - name: Configure VLANs, layer 3 interfaces and OSPF in one request
+    nxos_batch_config:
+      host: "{{ inventory_hostname }}"
+      username: "{{ lookup('env','ANSIBLE_NET_USERNAME') }}"
+      password: "{{ lookup('env','ANSIBLE_NET_PASSWORD') }}"
+      vlans: "{{ vlans }}"
+      l3_interfaces: "{{ l3_interfaces }}"
+      ospf: "{{ ospf }}"
+
+  Or once for the whole inventory, the module then runs the devices in parallel:
+
+  - name: Configure all switches
+    nxos_batch_config:
+      host: "{{ ansible_play_hosts }}"
+      hostvars: "{{ hostvars }}"
+      forks: 16
+      username: "{{ lookup('env','ANSIBLE_NET_USERNAME') }}"
+      password: "{{ lookup('env','ANSIBLE_NET_PASSWORD') }}"
+    run_once: true
+    register: nxos
+
+  - debug: var=nxos.devices
+
+   Each device reports the commands sent, its changed flag, elapsed seconds and any error:
+
+     "devices": {"172.16.30.101": {"changed": true, "commands": ["vlan 100", "name Management"], "elapsed": 0.84}}
+
+'''
+
+import re
+import sys
+import time
+import json
+import logging
+import getpass
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import AnsibleFanout
+except ImportError:
+    sys.path.append("/usr/share/ansible")
+    import AnsibleFanout
+
+# ---------------------------------------------------------------------------
+# LOGGING
+# ---------------------------------------------------------------------------
+
+logfilename = 'nxos_batch_config'
+logger = logging.getLogger(logfilename)
+hdlrObj = logging.FileHandler("/tmp/%s_%s_%s.log" % (logfilename, getpass.getuser(), time.strftime("%j")))
+formatter = logging.Formatter('%(asctime)s %(levelname)s %(message)s')
+hdlrObj.setFormatter(formatter)
+logger.addHandler(hdlrObj)
+logger.setLevel(logging.INFO)
+
+# role variables accepted by the module, in the order their configuration is applied
+ROLE_VARS = ["vlans", "l3_interfaces", "hsrp_interfaces", "uplinks", "trunks", "ospf"]
+
+# interface name prefixes as written in the variables, and as NX-OS shows them in the running config
+INTERFACE_NAMES = {"ethernet": "Ethernet", "eth": "Ethernet", "e": "Ethernet",
+                   "loopback": "loopback", "lo": "loopback",
+                   "vlan": "Vlan",
+                   "port-channel": "port-channel", "po": "port-channel",
+                   "mgmt": "mgmt"}
+
+
+# ---------------------------------------------------------------------------
+# NORMALIZE
+# ---------------------------------------------------------------------------
+
+def interface_name(name):
+    " return the interface name as NX-OS shows it, e.g. Loopback0 is loopback0, po10 is port-channel10 "
+    name = str(name).replace(" ", "")
+    m = re.match(r'([A-Za-z-]+)(.*)$', name)
+    if m is None:
+        return name
+    try:
+        return INTERFACE_NAMES[m.group(1).lower()] + m.group(2)
+    except KeyError:
+        return name
+
+
+def area_id(area):
+    " OSPF areas are shown in dotted decimal in the running config "
+    area = str(area)
+    if area.isdigit():
+        area = int(area)
+        return "%d.%d.%d.%d" % ((area >> 24) & 255, (area >> 16) & 255, (area >> 8) & 255, area & 255)
+    return area
+
+
+def normalize(line):
+    """ rewrite a configuration line the way it appears in the running config, so desired
+        and running lines can be compared
+    """
+    line = " ".join(line.split())
+    if line.startswith("interface "):
+        return "interface " + interface_name(line[len("interface "):])
+    m = re.match(r'(ip router ospf \S+ area) (\S+)$', line)
+    if m:
+        return "%s %s" % (m.group(1), area_id(m.group(2)))
+    m = re.match(r'channel-group (\d+)( force)?( mode on)?$', line)
+    if m:
+        return "channel-group %s" % m.group(1)                 # mode on is the default and not shown
+    return line
+
+
+# ---------------------------------------------------------------------------
+# DESIRED CONFIG
+# ---------------------------------------------------------------------------
+"""
+    The desired configuration is a list of (parents, line) tuples, parents is a tuple of
+    the context lines the line is entered under, e.g.
+
+      ((), "interface Vlan100")
+      (("interface Vlan100",), "ip address 172.16.100.2/24")
+"""
+
+def interface_lines(interface, lines):
+    " the interface context line followed by lines configured under it "
+    context = "interface %s" % interface_name(interface)
+    return [((), context)] + [((context,), line) for line in lines]
+
+
+def trunk_lines(port_channel_id, members, vpc=False):
+    " a port channel trunk, its member interfaces and optionally the vPC on it "
+    lines = ["switchport", "switchport mode trunk"]
+    if vpc:
+        lines.append("vpc %s" % port_channel_id)
+    config = interface_lines("port-channel%s" % port_channel_id, lines)
+    for member in members:
+        config.extend(interface_lines(member, ["switchport", "switchport mode trunk",
+                                               "channel-group %s force mode on" % port_channel_id]))
+    return config
+
+
+def desired_config(variables):
+    " build the desired configuration from the role variables of a device "
+    features = []
+    config = []
+
+    for vlan in variables.get("vlans") or []:
+        config.append(((), "vlan %s" % vlan["id"]))
+        config.append((("vlan %s" % vlan["id"],), "name %s" % vlan["name"]))
+
+    for item in variables.get("l3_interfaces") or []:
+        interface = "%s%s" % (item["interface_type"], item["interface_id"])
+        lines = []
+        if interface_name(interface).startswith("Ethernet"):
+            lines.append("no switchport")
+        if item.get("description"):
+            lines.append("description %s" % item["description"])
+        lines.append("ip address %s/%s" % (item["ip_address"], item["prefix"]))
+        lines.append("no shutdown")
+        config.extend(interface_lines(interface, lines))
+        features.append("interface-vlan")
+
+    for item in variables.get("hsrp_interfaces") or []:
+        group = "hsrp %s" % item["group"]
+        context = "interface %s" % interface_name(item["interface"])
+        config.extend(interface_lines(item["interface"], [group]))
+        config.append(((context, group), "ip %s" % item["vip"]))
+        features.append("hsrp")
+
+    for item in variables.get("uplinks") or []:
+        config.extend(trunk_lines(item["port_channel_id"], item["members"]))
+        features.append("lacp")
+
+    for item in variables.get("trunks") or []:
+        config.extend(trunk_lines(item["port_channel_id"], item["members"], vpc=True))
+        features.extend(["vpc", "lacp"])
+
+    ospf = variables.get("ospf")
+    if ospf:
+        config.append(((), "router ospf %s" % ospf["process_id"]))
+        for network in ospf.get("networks") or []:
+            config.extend(interface_lines(network["interface"],
+                                          ["ip router ospf %s area %s" % (ospf["process_id"], network["area"])]))
+        features.append("ospf")
+
+    enable = []
+    for feature in features:
+        if feature not in enable:
+            enable.append(feature)
+    return [((), "feature %s" % feature) for feature in enable] + config
+
+
+# ---------------------------------------------------------------------------
+# DIFF
+# ---------------------------------------------------------------------------
+
+def parse_running(text):
+    """ return the set of (parents, line) in the running config, nesting is taken from
+        the indentation of each line
+    """
+    running = set()
+    stack = []                                             # (indent, line) of the enclosing contexts
+    for raw in text.splitlines():
+        if not raw.strip() or raw.lstrip().startswith("!"):
+            continue
+        indent = len(raw) - len(raw.lstrip())
+        line = normalize(raw)
+        while stack and stack[-1][0] >= indent:
+            stack.pop()
+        running.add((tuple([context for i, context in stack]), line))
+        stack.append((indent, line))
+    return running
+
+
+def diff(desired, running):
+    """ return the CLI commands for the desired lines missing from the running config.
+        Context lines are repeated only when the following command needs a different context
+    """
+    openers = set([parents for parents, line in desired])
+    layer2 = set([parents for parents, line in running if line.startswith("switchport ")])
+    commands = []
+    context = ()
+    for parents, line in desired:
+        key = (tuple([normalize(parent) for parent in parents]), normalize(line))
+        if key in running:
+            continue
+        if line == "no shutdown" and key[0] and (key[0][:-1], key[0][-1]) in running \
+                and (key[0], "shutdown") not in running:
+            continue                                       # an existing interface is up, no shutdown is not shown;
+                                                           # a new one, e.g. an SVI, is created shut down
+        if line == "switchport" and key[0] in layer2:
+            continue                                       # only a layer 2 port has switchport options
+        if parents and parents != context:
+            commands.extend(parents)
+        commands.append(line)
+        context = parents
+        if parents + (line,) in openers:
+            context = parents + (line,)                   # the line entered a new context
+    return commands
+
+
+# ---------------------------------------------------------------------------
+# NX-API
+# ---------------------------------------------------------------------------
+
+def jsonrpc(session, url, commands, method, timeout):
+    """ issue the commands as one batched NX-API JSON-RPC request, returns the list of
+        results and a list of (command, message) for each command that failed
+    """
+    payload = [{"jsonrpc": "2.0", "method": method, "params": {"cmd": command, "version": 1}, "id": n + 1}
+               for n, command in enumerate(commands)]
+    r = session.post(url, data=json.dumps(payload), headers={'content-type': 'application/json-rpc'}, timeout=timeout)
+    try:
+        result = r.json()
+    except ValueError:
+        r.raise_for_status()
+        raise
+    if isinstance(result, dict):
+        result = [result]
+
+    errors = []
+    for item in result:
+        if "error" in item:
+            error = item["error"]
+            message = error.get("data", {}).get("msg") or error.get("message")
+            errors.append((commands[int(item.get("id", 1)) - 1], str(message).strip()))
+    return result, errors
+
+
+def get_session(params):
+    " an HTTP session holding one pooled connection and the NX-API authentication cookie "
+    session = requests.Session()
+    session.auth = (params["username"], params["password"])
+    session.verify = params["validate_certs"]
+    session.mount("%s://" % params["transport"], HTTPAdapter(pool_connections=1, pool_maxsize=1))
+    return session
+
+
+def configure_device(args):
+    """ read the running config of one device, compute and push the missing commands,
+        run by the thread pool in configure_devices
+    """
+    host, variables, params, check_mode = args
+    start = time.time()
+    report = dict(changed=False, commands=[])
+    port = params["port"] or {"http": 80, "https": 443}[params["transport"]]
+    url = "%s://%s:%s/ins" % (params["transport"], host, port)
+
+    session = get_session(params)
+    try:
+        result, errors = jsonrpc(session, url, ["show running-config"], "cli_ascii", params["timeout"])
+        if errors:
+            report["error"] = "%s: %s" % errors[0]
+        else:
+            running = parse_running(result[0]["result"]["msg"])
+            commands = diff(desired_config(variables), running)
+            report["commands"] = commands
+            report["changed"] = bool(commands)
+            if commands and not check_mode:
+                result, errors = jsonrpc(session, url, commands, "cli", params["timeout"])
+                if errors:
+                    report["error"] = "; ".join(["%s: %s" % error for error in errors])
+    except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+        report["error"] = "%s: %s" % (e.__class__.__name__, e)
+    finally:
+        session.close()
+
+    report["elapsed"] = round(time.time() - start, 3)
+    return host, report
+
+
+def configure_devices(hosts, hostvars, params, check_mode):
+    """ configure each device, at most forks at a time. Returns a dictionary of
+        the report for each device, keyed by host
+    """
+    work = []
+    for host in hosts:
+        variables = {}
+        for name in ROLE_VARS:
+            variables[name] = (hostvars.get(host) or {}).get(name, params[name])
+        work.append((host, variables, params, check_mode))
+
+    return AnsibleFanout.fan_out(configure_device, work, params["forks"])
+
+
+# ---------------------------------------------------------------------------
+# MAIN
+# ---------------------------------------------------------------------------
+
+def main():
+
+    module = AnsibleModule(
+        argument_spec = dict(
+            host = dict(required=True, type='list'),
+            hostvars = dict(required=False, default={}, type='dict', no_log=True),
+            username = dict(required=True),
+            password = dict(required=True, no_log=True),
+            transport = dict(required=False, default='http', choices=['http', 'https']),
+            port = dict(required=False, type='int'),
+            validate_certs = dict(required=False, default=False, type='bool'),
+            timeout = dict(required=False, default=15, type='int'),
+            forks = dict(required=False, default=8, type='int'),
+            vlans = dict(required=False, type='list'),
+            l3_interfaces = dict(required=False, type='list'),
+            hsrp_interfaces = dict(required=False, type='list'),
+            uplinks = dict(required=False, type='list'),
+            trunks = dict(required=False, type='list'),
+            ospf = dict(required=False, type='dict')
+         ),
+        supports_check_mode=True
+    )
+
+    hosts = AnsibleFanout.unique(module.params["host"])
+    devices = configure_devices(hosts, module.params["hostvars"], module.params, module.check_mode)
+    changed, failed = AnsibleFanout.summarize(hosts, devices)
+    AnsibleFanout.log_reports(logger, hosts, devices, [("COMMANDS", lambda report: len(report["commands"]))])
+
+    if failed:
+        module.fail_json(msg="failed to configure %s" % ", ".join(failed), changed=changed, devices=devices)
+    module.exit_json(changed=changed, devices=devices)
+
+
+from ansible.module_utils.basic import *
+if __name__ == '__main__':
+    main()